@@ -0,0 +1,7 @@
+"""
+Benchmarks for performance-sensitive parts
+of docflow. They use the scraped reference
+files, so run the scraper at least once and
+start them from the root directory, e.g.
+    python3 -m benchmarks.search
+"""
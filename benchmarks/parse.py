@@ -0,0 +1,107 @@
+"""
+Measures how many saved cppreference pages
+the `CppSymbolSpider` parses per second, split
+into building the HTML tree of a page and
+extracting the symbol from it.
+
+By default, the pages in `benchmarks/fixtures`
+are parsed: a small set of function and type
+symbol pages, and a page which is not a symbol.
+They are synthetic, with the markup of
+cppreference.com but placeholder text and
+padding scripts, so the numbers they give are
+only rough. Pages can also be taken from the
+HTTP cache the spider fills while scraping,
+or from another directory with saved pages
+as `.html` files.
+
+Usage:
+    python3 -m benchmarks.parse [pages directory] [rounds]
+    python3 -m benchmarks.parse docflow/.scrapy/httpcache/cpp_symbols
+"""
+
+import gzip
+import os
+import pickle
+import sys
+import time
+from typing import List
+
+from scrapy.http import HtmlResponse
+
+from docflow.scraper.spiders.cpp_symbol_spider import CppSymbolSpider, SymbolPage
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_body(path: str) -> bytes:
+    """Returns the contents of a saved page, which may be gzipped."""
+
+    with open(path, 'rb') as page_file:
+        body = page_file.read()
+    return gzip.decompress(body) if body[:2] == b'\x1f\x8b' else body
+
+
+def load_pages(directory: str) -> List[HtmlResponse]:
+    """
+    Loads the symbol pages in `directory`, either
+    saved as `.html` files or cached by scrapy's
+    HTTP cache, as responses.
+    """
+
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(".html"):
+                url = "http://en.cppreference.com/w/cpp/" + name[:-5]
+                pages.append((url, os.path.join(root, name)))
+            elif name == "pickled_meta":
+                meta = pickle.loads(read_body(os.path.join(root, name)))
+                if meta['status'] == 200 and meta['url'] not in CppSymbolSpider.start_urls:
+                    pages.append((meta['url'], os.path.join(root, "response_body")))
+    return [
+        HtmlResponse(url, body=read_body(path), encoding='utf-8') for url, path in pages
+    ]
+
+
+def main():
+    """Runs the benchmark and prints the results."""
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    bodies = [(page.url, page.body) for page in load_pages(directory)]
+    if not bodies:
+        sys.exit(f"No saved pages found in {directory}.")
+
+    spider = CppSymbolSpider()
+    tree_time = collect_time = extract_time = float('inf')
+    items = 0
+    for _ in range(rounds):
+        # The tree is built on first access, so every round needs new responses
+        pages = [HtmlResponse(url, body=body, encoding='utf-8') for url, body in bodies]
+
+        start = time.perf_counter()
+        for page in pages:
+            page.selector.root  # pylint: disable=pointless-statement
+        tree_time = min(tree_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for page in pages:
+            SymbolPage.from_response(page)
+        collect_time = min(collect_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        items = sum(1 for page in pages for _ in spider.parse_symbol_index(page))
+        extract_time = min(extract_time, time.perf_counter() - start)
+
+    print(f"{len(bodies)} pages, {items} symbols, best of {rounds} rounds")
+    print(f"{'':22} {'ms/page':>8} {'pages/s':>8}")
+    for name, total in (("HTML tree", tree_time),
+                        ("SymbolPage", collect_time),
+                        ("parse_symbol_index()", extract_time),
+                        ("total", tree_time + extract_time)):
+        print(f"{name:22} {total / len(bodies) * 1000:8.2f} {len(bodies) / total:8.0f}")
+
+
+if __name__ == '__main__':
+    main()
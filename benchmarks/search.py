@@ -0,0 +1,88 @@
+"""
+Compares the per-item `search` function against
+the batched `Matcher` and the trigram-pruned
+`FuzzyIndex` on the scraped C++ stub and
+symbol names. Queries are taken from the names
+themselves with a few random typos applied.
+
+Usage:
+    python3 -m benchmarks.search [number of queries]
+"""
+
+import random
+import sys
+import time
+
+from docflow.bot.extract.search import FuzzyIndex, Matcher, ratio, search
+from docflow.bot.extract.util import get_ref_store
+
+TYPO_CHARS = "abcdefghijklmnopqrstuvwxyz_:"
+
+
+def add_typos(name: str, rand: random.Random) -> str:
+    """Returns `name` with up to three random edits applied."""
+
+    chars = list(name)
+    for _ in range(rand.randint(0, 3)):
+        pos = rand.randrange(len(chars) + 1)
+        operation = rand.randrange(3)
+        if operation == 0 and pos < len(chars):
+            del chars[pos]
+        elif operation == 1:
+            chars.insert(pos, rand.choice(TYPO_CHARS))
+        elif pos < len(chars):
+            chars[pos] = rand.choice(TYPO_CHARS)
+    return ''.join(chars) or name
+
+
+def count_mismatches(expected, results, queries):
+    """
+    Returns how many results have a worse ratio
+    than the expected ones. Different items may tie
+    for the lowest ratio, so the ratios are compared.
+    """
+
+    return sum(
+        old != new and ratio(old, query) != ratio(new, query)
+        for old, new, query in zip(expected, results, queries)
+    )
+
+
+def timed(func, args):
+    """Returns the results of `func` for all arguments and the seconds it took."""
+
+    start = time.perf_counter()
+    results = [func(arg) for arg in args]
+    return results, time.perf_counter() - start
+
+
+def main():  # pylint: disable=too-many-locals
+    """Runs the benchmark and prints the results."""
+
+    query_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    names = [
+        name for ref in ("cpp_stubs", "cpp_symbols")
+        for names in get_ref_store(ref).names for name in names
+    ]
+
+    rand = random.Random(0)
+    queries = [add_typos(rand.choice(names), rand) for _ in range(query_count)]
+
+    (matcher, index), build_times = timed(lambda cls: cls(names), (Matcher, FuzzyIndex))
+
+    old_results, old_time = timed(lambda query: search(names, query), queries)
+    matcher_results, matcher_time = timed(matcher.search, queries)
+    index_results, index_time = timed(lambda query: index.top(query)[0][0], queries)
+
+    print(f"{len(names)} names, {query_count} queries")
+    print(f"Build time for both indexes: {build_times * 1000:.1f} ms")
+    print(f"{'':18} {'ms/query':>10} {'speedup':>8} {'mismatches':>10}")
+    for name, results, total in (("search()", old_results, old_time),
+                                 ("Matcher.search()", matcher_results, matcher_time),
+                                 ("FuzzyIndex.top()", index_results, index_time)):
+        print(f"{name:18} {total / query_count * 1000:10.2f} {old_time / total:7.1f}x"
+              f" {count_mismatches(old_results, results, queries):10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,46 @@ If you wish to scrape the files manually,
 simply pass `scrape` as an argument:
     python3 -m docflow scrape
 This will start the also start the bot afterwards.
+The spiders run at the same time, in a single
+scrapy CrawlerProcess. To limit how many run at
+once, pass `--jobs`, for example `--jobs 1` to run
+them one after another. If any spider fails, the
+bot is not started and the exit status is 1.
+
+How fast the spiders crawl is set by a crawl
+profile, `polite` by default. For a first crawl
+without cached pages, `fast-cold` uses more
+concurrent requests and shorter delays, while
+`cache-only` never sends requests for pages that
+are not cached (see scraper/throughput.py):
+    python3 -m docflow scrape --profile fast-cold
+The throughput of every run is appended to
+`docflow/.scrapy/run_stats.jsonl`.
+
+To refresh the reference files without parsing
+every page again, pass `--incremental` as well:
+    python3 -m docflow scrape --incremental
+This sends conditional requests for the pages
+scraped before, only parses the pages that
+changed and merges the results into the
+existing reference stores.
+
+The spiders write their items directly into
+compact reference stores which the bot reads
+from. Afterwards, stores of the rendered embeds
+for every record are built. To only rebuild these
+stores, for example from JSON files exported
+through `scrapy crawl -o`, pass `build`:
+    python3 -m docflow build
+
+After changing how the spiders extract data
+from the pages, the reference stores can be
+rebuilt from the pages in scrapy's HTTP cache,
+without any requests or throttling, by passing
+`reparse`, which parses the pages in a pool of
+processes, one per core unless `--processes`
+is given:
+    python3 -m docflow reparse
 Make sure to export an environment variable named
     DISCORD_TOKEN
 since the bot uses this to securely log in
@@ -27,11 +67,30 @@ setup configuration, such as setting the prefix,
 the description along with basic event handlers.
 """
 
+import argparse
+import json
 import os
-import subprocess
+import shutil
 import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.project import data_path, get_project_settings
+from twisted.internet import defer
 
 from . import start
+from .bot.extract.util import build_rendered_store
+from .bot.util.store import ReferenceStore, StoreWriter, build_store
+from .scraper.incremental_crawl import merge_items
+from .scraper.frontier import load_redirects
+from .scraper.reparse import reparse
+from .scraper.settings import CRAWL_PROFILE, CRAWL_PROFILES
+from .scraper.throughput import apply_profile
 
 SCRAPY_SPIDERS = (
     "cpp_stubs",
@@ -48,62 +107,293 @@ REFERENCE_DIR = os.path.join(
 
 INITIAL_DIR = os.getcwd()
 
+# Where the spiders keep the state for incremental scraping
+STATE_DIR = os.path.join(os.path.dirname(SCRAPY_DIR), ".scrapy", "incremental")
+
 
-def run_spider(spider_name: str):
+def crawl(spiders: Sequence[str], jobs: int, incremental: bool, output_dir: str,  # pylint: disable=too-many-arguments
+          profile: str = CRAWL_PROFILE) -> List[str]:
     """
-    Runs a single spider and outputs
-    to a JSON file. Log levels are
-    set to WARN to reduce clutter.
+    Runs the given spiders in a single scrapy
+    CrawlerProcess, up to `jobs` at the same time,
+    using the given crawl profile, and informs the
+    user about the end of each spider. The
+    ReferencePipeline writes the items of every
+    spider into the reference store
+    `<spider name>.ref` in `output_dir`.
+    Log levels are set to WARN to reduce clutter.
+    Returns the names of the spiders that failed.
     """
 
-    spider_file_name = spider_name.lower() + ".json"
-    spider_path = os.path.join(REFERENCE_DIR, spider_file_name)
+    # Scrapy finds its project settings and data directory from the working directory
+    os.chdir(SCRAPY_DIR)
+    try:
+        settings = get_project_settings()
+        apply_profile(settings, profile)
+        settings.set('LOG_LEVEL', 'WARN')
+        # All spiders of this run share the pages they have seen
+        settings.set('FRONTIER_RUN', uuid.uuid4().hex)
+        settings.set('REFERENCE_OUTPUT_DIR', output_dir)
+        if incremental:
+            settings.set('INCREMENTAL', True)
+            settings.set('HTTPCACHE_EXPIRATION_SECS', 1)
 
-    if os.path.exists(spider_path):
-        os.remove(spider_path)
-        print(f"Removed existing reference file {spider_file_name}.")
+        process = CrawlerProcess(settings)
+        semaphore = defer.DeferredSemaphore(max(jobs, 1))
+        failed = []
+        finished = []
 
-    subprocess.Popen(
-        [
-            "python3", "-m",
-            "scrapy", "crawl", spider_name,
-            "--loglevel", "WARN",
-            "-o", spider_path
-        ],
-        stdout=sys.stdout,
-        stderr=sys.stderr
-    ).communicate()
+        def run(name: str):
+            """Runs the spider `name` and reports how it went once it finished."""
 
+            crawler = process.create_crawler(name)
+            start_time = time.perf_counter()
 
-def scrape_data():
+            def report(result):
+                stats = crawler.stats.get_stats()
+                if crawl_succeeded(stats, incremental):
+                    status = f"done, {stats.get('reference/stored', 0)} items stored"
+                else:
+                    reason = stats.get('finish_reason', result)
+                    if reason == 'finished':
+                        reason = 'no items stored'
+                    status = f"failed ({reason})"
+                    failed.append(name)
+                finished.append(name)
+                print(f"[{len(finished)}/{len(spiders)}] Spider {name} {status} "
+                      f"after {time.perf_counter() - start_time:.1f}s "
+                      f"({stats.get('run/requests_per_second', 0)} requests/s, "
+                      f"{stats.get('run/cache_hit_ratio', 0):.0%} from cache, "
+                      f"{stats.get('run/duplicates_skipped', 0)} duplicates skipped).")
+
+            return process.crawl(crawler).addBoth(report)
+
+        print(f"Running {len(spiders)} spiders, {jobs} at a time...")
+        crawls = [semaphore.run(run, name) for name in spiders]
+
+        # Stop once all spiders finished, including those that had to wait for their turn.
+        # They may all fail before the reactor runs, so the stop is scheduled on the reactor.
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+        defer.DeferredList(crawls).addBoth(lambda _: reactor.callLater(0, reactor.stop))
+        process.start(stop_after_crawl=False)
+    finally:
+        os.chdir(INITIAL_DIR)
+    return failed
+
+
+def crawl_succeeded(stats: dict, incremental: bool) -> bool:
     """
-    Runs all spiders specified above
-    and informs the user about the start
-    and end of each spider.
+    Returns whether a crawl with the given stats
+    succeeded: it must have finished, and either
+    stored items or, when scraping incrementally,
+    found that the pages did not change.
+    """
+
+    if stats.get('finish_reason') != 'finished':
+        return False
+    if stats.get('reference/stored', 0):
+        return True
+    return incremental and any(
+        stats.get(key, 0) for key in ('incremental/not_modified', 'incremental/unchanged')
+    )
+
+
+def merge_reference(spider_name: str, output_path: str):
+    """
+    Merges the items an incremental run of the
+    given spider wrote into the store at
+    `output_path` into its reference store,
+    which is replaced atomically.
+    """
+
+    store_path = os.path.join(REFERENCE_DIR, spider_name + ".ref")
+    with open(os.path.join(STATE_DIR, spider_name + ".json"), encoding='utf-8') as state_file:
+        state = json.load(state_file)
+
+    old = ReferenceStore(store_path) if os.path.exists(store_path) else []
+    new = ReferenceStore(output_path) if os.path.exists(output_path) else []
+    with StoreWriter(store_path) as writer:
+        for record in merge_items(old, new, state['requested'], state['changed'],
+                                  state['gone']):
+            writer.add(record)
+    for store in (old, new):
+        if isinstance(store, ReferenceStore):
+            store.close()
+
+    print(f"[{spider_name}] Merged {len(new)} changed items, "
+          f"{len(writer) - len(new)} unchanged items kept, "
+          f"{len(old) + len(new) - len(writer)} items replaced or removed.")
+
+
+def scrape_data(jobs: int = len(SCRAPY_SPIDERS), incremental: bool = False,
+                profile: str = CRAWL_PROFILE) -> bool:
+    """
+    Runs all spiders specified above, up to
+    `jobs` at the same time, with the given crawl
+    profile. They write their items into the
+    reference stores directly, after which the
+    embeds for the stores are rendered.
+
+    If `incremental` is set, only pages that
+    changed since the last scrape are parsed,
+    and the results are merged into the existing
+    reference stores.
+
+    Returns whether all spiders succeeded.
+    """
+
+    output_dir = tempfile.mkdtemp(prefix="docflow-scrape-") if incremental else REFERENCE_DIR
+    failed = crawl(SCRAPY_SPIDERS, jobs, incremental, output_dir, profile)
+
+    for name in SCRAPY_SPIDERS:
+        if name in failed:
+            continue
+        if incremental:
+            merge_reference(name, os.path.join(output_dir, name + ".ref"))
+        finish_store(name)
+
+    if incremental:
+        shutil.rmtree(output_dir, ignore_errors=True)
+    if failed:
+        print(f"Scraping failed for: {', '.join(failed)}.", file=sys.stderr)
+        return False
+    print("Scraping done.")
+    return True
+
+
+def reparse_data(processes: Optional[int] = None) -> bool:
+    """
+    Rebuilds the reference stores of all spiders
+    specified above from the pages in scrapy's
+    HTTP cache, without sending any requests.
+    The pages are parsed by a pool of `processes`
+    worker processes, by default one per core.
+
+    Returns whether items were found for all spiders.
     """
 
-    print("Changing to scrapy directory...")
     os.chdir(SCRAPY_DIR)
+    try:
+        settings = get_project_settings()
+        spider_loader = SpiderLoader.from_settings(settings)
+        cache_dir = data_path(settings['HTTPCACHE_DIR'], createdir=False)
+        redirects = load_redirects(
+            settings.get('FRONTIER_DB') or data_path('frontier.sqlite', createdir=False)
+        )
+    finally:
+        os.chdir(INITIAL_DIR)
+
+    failed = []
+    with ProcessPoolExecutor(processes) as executor:
+        for name in SCRAPY_SPIDERS:
+            start_time = time.perf_counter()
+            stats = reparse(
+                spider_loader.load(name), os.path.join(cache_dir, name),
+                os.path.join(REFERENCE_DIR, name + ".ref"), executor, redirects
+            )
+            print(f"[{name}] Parsed {stats['parsed']} cached pages "
+                  f"({stats['missing']} missing) into {stats['stored']} items "
+                  f"in {time.perf_counter() - start_time:.1f}s.")
+            if stats['stored']:
+                finish_store(name)
+            else:
+                failed.append(name)
+
+    if failed:
+        print(f"No cached pages found for: {', '.join(failed)}. "
+              "Scrape at least once to fill the cache.", file=sys.stderr)
+        return False
+    print("Reparsing done.")
+    return True
+
+
+def finish_store(name: str):
+    """
+    Removes the outdated JSON file of a reference
+    store which was just written, and renders the
+    embeds for its records.
+    """
+
+    # The store was written directly, so an older JSON file must not replace it
+    json_path = os.path.join(REFERENCE_DIR, name + ".json")
+    if os.path.exists(json_path):
+        os.remove(json_path)
+        print(f"Removed outdated reference file {name}.json.")
+
+    print(f"Rendering embeds into {name}_embeds.ref...")
+    build_rendered_store(name)
+
+
+def build_stores():
+    """
+    Converts JSON files with scraped reference
+    data, if there are any, into compact reference
+    stores, which the bot reads its reference data
+    from, and renders the embeds for their records.
+    """
+
+    for name in SCRAPY_SPIDERS:
+        json_path = os.path.join(REFERENCE_DIR, name + ".json")
+        if os.path.exists(json_path):
+            print(f"Building reference store {name}.ref...")
+            with open(json_path, encoding='utf-8') as ref:
+                build_store(json.load(ref), os.path.join(REFERENCE_DIR, name + ".ref"))
+        print(f"Rendering embeds into {name}_embeds.ref...")
+        build_rendered_store(name)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the command line arguments."""
 
-    for spider in SCRAPY_SPIDERS:
-        print(f"Running Spider {spider}... ")
-        run_spider(spider)
-        print("Done.")
-    print("Scraping done. Changing back to initial directory.")
-    os.chdir(INITIAL_DIR)
+    parser = argparse.ArgumentParser(prog="python3 -m docflow")
+    parser.add_argument(
+        "command", nargs="?", choices=("scrape", "reparse", "build"),
+        help=("scrape the reference data again, parse it again from the cached pages, "
+              "or only rebuild the reference stores")
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=len(SCRAPY_SPIDERS),
+        help="how many spiders run at the same time (default: all of them)"
+    )
+    parser.add_argument(
+        "-i", "--incremental", action="store_true",
+        help="only parse pages that changed since the last scrape"
+    )
+    parser.add_argument(
+        "--profile", choices=tuple(CRAWL_PROFILES), default=CRAWL_PROFILE,
+        help=f"the crawl profile to scrape with (default: {CRAWL_PROFILE})"
+    )
+    parser.add_argument(
+        "-p", "--processes", type=int,
+        help="how many processes parse the cached pages when reparsing (default: one per core)"
+    )
+    args = parser.parse_args()
+    if args.incremental and args.profile == "cache-only":
+        parser.error("--incremental needs requests, so it cannot use the cache-only profile")
+    return args
 
 
 if __name__ == '__main__':
+    ARGS = parse_args()
     print("Checking if reference files exist...")
 
     os.makedirs(REFERENCE_DIR, exist_ok=True)
 
-    if not os.listdir(REFERENCE_DIR):
+    if ARGS.command == "reparse":
+        print("Reparsing was manually invoked. Parsing the cached pages...")
+        if not reparse_data(ARGS.processes):
+            sys.exit(1)
+    elif not os.listdir(REFERENCE_DIR):
         print("Reference files do not exist. Starting Scrapy...")
-        scrape_data()
-    elif sys.argv.pop() == "scrape":
+        if not scrape_data(ARGS.jobs, profile=ARGS.profile):
+            sys.exit(1)
+    elif ARGS.command == "scrape":
         print("Scraping was manually invoked. Starting Scrapy...")
-        scrape_data()
+        if not scrape_data(ARGS.jobs, ARGS.incremental, ARGS.profile):
+            sys.exit(1)
+    elif ARGS.command == "build":
+        print("Building reference stores...")
+        build_stores()
     else:
         print("References files found.")
 
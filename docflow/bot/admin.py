@@ -39,6 +39,30 @@ class Admin:
             colour=discord.Colour.green()
         ))
 
+    @commands.command()
+    @commands.has_permissions(manage_server=True)
+    async def reloaddocs(self, ctx):
+        """Reload the documentation reference data without reloading any Cogs."""
+
+        doc_search = self.bot.get_cog('DocSearch')
+        if doc_search is None:
+            await ctx.send(embed=discord.Embed(
+                title='The DocSearch Cog is not loaded.',
+                colour=discord.Colour.red()
+            ))
+        elif await doc_search.start_loading(reload=True):
+            await ctx.send(embed=discord.Embed(
+                title='Reload Complete',
+                description=f'Reloaded the reference data in {doc_search.load_time:.2f}s.',
+                colour=discord.Colour.green()
+            ))
+        else:
+            await ctx.send(embed=discord.Embed(
+                title='Failed to reload the reference data:',
+                description=str(doc_search.load_error),
+                colour=discord.Colour.red()
+            ))
+
     @commands.command()
     @commands.has_permissions(manage_server=True)
     async def reload(self, ctx, *, cog_name: str):
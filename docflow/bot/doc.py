@@ -1,45 +1,234 @@
-"""Contains the documentation search cog."""
+"""
+Contains the documentation search cog.
 
+The reference data for the search is loaded
+in the background once the Bot logged in, so
+that loading it does not delay connecting to
+Discord. Until it is loaded, the commands reply
+that the index is still warming up.
+
+Afterwards, the reference files are watched
+for changes. Changed files are loaded in the
+background as well, and replace the old data
+only once loading them completed.
+"""
+
+import asyncio
+import sys
+import time
+import zlib
+
+from typing import Optional
+
+import discord
 from discord.ext import commands
 from . import extract
+from .util.cache import LRUCache
 from .util.paged_embed import PagedEmbed
 
+# How many rendered replies are cached, unless set in the configuration
+DEFAULT_CACHE_SIZE = 256
+
+# How often the reference files are checked for changes, in seconds. 0 disables this.
+DEFAULT_WATCH_INTERVAL = 60
+
 
 class DocSearch:
     """Documentation search commands."""
 
     def __init__(self, bot):
         self.bot = bot
+        self.cache = LRUCache(bot.config.get('doc_cache_size', DEFAULT_CACHE_SIZE))
+        self._generation = extract.cpp_generation()
+        self._loading = None
+        self.load_error = None
+        self.load_time = None
+
+        # When the Cog is loaded at runtime, on_ready was already emitted
+        if bot.is_ready():
+            self.start_loading()
+        self._watcher = bot.loop.create_task(self.watch_reference(
+            bot.config.get('reference_watch_interval', DEFAULT_WATCH_INTERVAL)
+        ))
+
+    def __unload(self):
+        self._watcher.cancel()
+
+    async def on_ready(self):
+        """Starts loading the reference data once the Bot is logged in."""
+
+        self.start_loading()
+
+    def start_loading(self, reload: bool = False) -> Optional[asyncio.Task]:
+        """
+        Starts loading the reference data in the
+        background and returns the task doing so.
+        If the data is currently being loaded,
+        the running task is returned instead.
+        Unless `reload` is set, nothing is done
+        if the data was already loaded.
+        """
+
+        if self._loading is not None and not self._loading.done():
+            return self._loading
+        if extract.cpp_loaded() and not reload:
+            return None
+        self._loading = self.bot.loop.create_task(self.load_reference())
+        return self._loading
+
+    async def load_reference(self) -> bool:
+        """
+        Loads the reference data in an executor
+        to avoid blocking the event loop and
+        records how long it took, or the error
+        that occurred while loading it. Returns
+        whether loading the data succeeded.
+        """
+
+        start = time.perf_counter()
+        try:
+            await self.bot.loop.run_in_executor(None, extract.cpp_reload)
+        except (OSError, ValueError, KeyError, zlib.error) as err:
+            self.load_error = err
+            print(f'Failed to load the C++ reference data: {err}', file=sys.stderr)
+            return False
+
+        self.load_error = None
+        self.load_time = time.perf_counter() - start
+        print(f'Loaded the C++ reference data in {self.load_time:.2f}s.')
+        return True
+
+    async def watch_reference(self, interval: float):
+        """
+        Checks the reference files for changes every
+        `interval` seconds. Once the files changed and
+        then stayed the same for one more interval, so
+        that files which are still being written are not
+        loaded, the reference data is reloaded.
+        Errors while checking are printed, and do
+        not stop the watcher.
+        """
+
+        if not interval:
+            return
+
+        known = extract.get_ref_mtimes()
+        pending = None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                current = extract.get_ref_mtimes()
+                if current == known:
+                    pending = None
+                elif current != pending:
+                    pending = current
+                else:
+                    await self.start_loading(reload=True)
+                    known = extract.get_ref_mtimes()
+                    pending = None
+            except Exception as err:  # pylint: disable=broad-except
+                # Keep watching, the next check may succeed
+                print(f'Failed to check the C++ reference data for changes: {err!r}',
+                      file=sys.stderr)
+
+    async def check_loaded(self, ctx) -> bool:
+        """
+        Returns whether the reference data is loaded.
+        If it is not, the user is told why.
+        """
+
+        if extract.cpp_loaded():
+            return True
+
+        if self.load_error is not None:
+            await ctx.send(embed=discord.Embed(
+                title='The C++ reference data could not be loaded.',
+                description=str(self.load_error),
+                colour=discord.Colour.red()
+            ))
+        else:
+            await ctx.send("The documentation index is warming up, please try again shortly.")
+        return False
+
+    def cached(self, key: tuple, render: callable):
+        """
+        Returns the cached reply for the given key.
+        On a miss, `render` is called to create
+        the reply, which is then cached. Replies are
+        either a string or a list of embed dicts.
+        The cache is cleared when the reference
+        data was reloaded since the last lookup.
+        """
+
+        generation = extract.cpp_generation()
+        if generation != self._generation:
+            self.cache.clear()
+            self._generation = generation
+
+        reply = self.cache.get(key)
+        if reply is None:
+            reply = render()
+            self.cache[key] = reply
+        return reply
+
+    @staticmethod
+    def render_cppref(symbol: str):
+        """Renders the reply for the cppref command."""
+
+        result = extract.cpp_symbol_pages(symbol)
+        if result is None:
+            suggestions = extract.cpp_suggest(symbol)
+            if suggestions:
+                names = ', '.join(f'`{name}`' for name in suggestions)
+                return f"Sorry, not found. Did you mean {names}?"
+            return "Sorry, not found."
+        return result[0]
+
+    @staticmethod
+    def render_cppstub(query: str):
+        """Renders the reply for the cppstub command."""
+
+        pages = extract.cpp_stub_pages(query)
+        if pages is None:
+            return "Sorry, not found."
+        return pages
+
+    async def send_reply(self, ctx, reply):
+        """Sends a reply created by one of the render methods."""
+
+        if isinstance(reply, str):
+            await ctx.send(reply)
+        elif len(reply) > 1:
+            embed = PagedEmbed(ctx, self.bot, "🍏", discord.Embed.from_dict(reply[0]))
+            embed.add_page("💛", discord.Embed.from_dict(reply[1]))
+            await embed.send()
+        else:
+            await ctx.send(embed=discord.Embed.from_dict(reply[0]))
 
     @commands.command()
     async def cppref(self, ctx, symbol: str):
         """Searches the stored data from Cppreference for the given symbol."""
 
+        if not await self.check_loaded(ctx):
+            return
+
+        symbol = symbol.strip()
         if not symbol.startswith("std::"):
             symbol = "std::" + symbol
 
-        result = extract.cpp_symbol(symbol)
-        if result is None:
-            await ctx.send("Sorry, not found.")
-        else:
-            extracted, symbol_type = result
-            if symbol_type == 1:
-                embed = PagedEmbed(ctx, self.bot, "🍏", extracted[0])
-                embed.add_page("💛", extracted[1])
-                await embed.send()
-            elif symbol_type == 0:
-                embed = extracted[0]
-                await ctx.send(embed=embed)
+        reply = self.cached(('cppref', symbol), lambda: self.render_cppref(symbol))
+        await self.send_reply(ctx, reply)
 
     @commands.command()
     async def cppstub(self, ctx, *, query: str):
         """Searches the database for C++ stubs and returns the closest item"""
 
-        extracted = extract.cpp_stub(query)
-        if extracted is None:
-            await ctx.send("Sorry, not found.")
-        else:
-            await ctx.send(embed=extracted)
+        if not await self.check_loaded(ctx):
+            return
+
+        query = ' '.join(query.split())
+        reply = self.cached(('cppstub', query), lambda: self.render_cppstub(query))
+        await self.send_reply(ctx, reply)
 
 
 def setup(bot):
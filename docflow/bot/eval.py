@@ -1,13 +1,56 @@
 """
 This module contains functions
-for evaluating code using the Coliru API.
+for evaluating code using the Coliru API
+or other evaluation backends, which can be
+chosen per language in the configuration.
+
+Long results are split into pages which can
+be browsed through a PagedEmbed. If there are
+too many pages for that, the first page is
+sent along with the full result as a file.
 """
 
+import asyncio
 import datetime
+import hashlib
+import io
+import json
+import os
+import sys
+
 import discord
 
 from discord.ext import commands
 from .util import coliru
+from .util.backend import EvalError
+from .util.cache import TTLCache
+from .util.local import LocalBackend
+from .util.output import paginate
+from .util.paged_embed import PagedEmbed
+from .util.scheduler import EvalScheduler, QueueFull
+
+# Backend classes by the names used to select them in the configuration
+BACKENDS = {backend.name: backend for backend in (coliru.Coliru, LocalBackend)}
+
+# How many evaluations may run at once, unless set in the configuration
+DEFAULT_CONCURRENCY = 4
+
+# How many evaluations may wait for a free slot, unless set in the configuration
+DEFAULT_QUEUE_SIZE = 20
+
+# How many results are cached and for how many seconds, unless set in the configuration
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_CACHE_TTL = 60 * 60
+
+# How often new results are saved to the cache file, in seconds, unless set in the configuration
+DEFAULT_CACHE_SAVE_INTERVAL = 5 * 60
+
+# How many characters of the result are shown per page, leaving room for the code block
+PAGE_SIZE = 1000
+
+# The emojis used to navigate the pages of a result. Longer results are sent as a file.
+PAGE_EMOJIS = ['1\u20e3', '2\u20e3', '3\u20e3', '4\u20e3', '5\u20e3',
+               '6\u20e3', '7\u20e3', '8\u20e3', '9\u20e3']
 
 
 LANGUAGE_IMAGES = {
@@ -39,11 +82,92 @@ LANGUAGE_NAMES = {
 }
 
 
-class Eval:
-    """Evaluation Command(s) using the Coliru API."""
+class Eval:  # pylint: disable=too-many-instance-attributes
+    """Evaluation Command(s) using the Coliru API or a local backend."""
 
     def __init__(self, bot):
         self.bot = bot
+        eval_config = bot.config.get('eval', {})
+
+        # Each backend is configured through the section named after it
+        backend_names = eval_config.get('backends', {})
+        default_backend = backend_names.get('default', coliru.Coliru.name)
+        self.lang_backends = {
+            lang: backend_names.get(lang, default_backend) for lang in coliru.LANGS
+        }
+        unknown = set(self.lang_backends.values()) - set(BACKENDS)
+        if unknown:
+            raise ValueError(f'Unknown eval backends: {", ".join(unknown)}')
+        self.backends = {
+            name: BACKENDS[name](**bot.config.get(name, {}))
+            for name in set(self.lang_backends.values())
+        }
+        for backend in self.backends.values():
+            bot.loop.create_task(backend.start())
+
+        self.scheduler = EvalScheduler(
+            concurrency=eval_config.get('concurrency', DEFAULT_CONCURRENCY),
+            max_queued=eval_config.get('queue_size', DEFAULT_QUEUE_SIZE)
+        )
+
+        # Results of identical submissions, optionally persisted to `cache_file`
+        cache_config = eval_config.get('cache', {})
+        self.cache = TTLCache(
+            cache_config.get('size', DEFAULT_CACHE_SIZE),
+            cache_config.get('ttl', DEFAULT_CACHE_TTL)
+        )
+        self.cache_file = cache_config.get('file')
+        self._cache_changed = False
+        self._cache_saver = None
+        if self.cache_file is not None:
+            if os.path.exists(self.cache_file):
+                try:
+                    self.cache.load(self.cache_file)
+                except (OSError, ValueError, TypeError) as err:
+                    self.cache.clear()
+                    print(f'Failed to load the eval cache, starting empty: {err}',
+                          file=sys.stderr)
+            self._cache_saver = bot.loop.create_task(self.save_cache(
+                cache_config.get('save_interval', DEFAULT_CACHE_SAVE_INTERVAL)
+            ))
+
+    def __unload(self):
+        for backend in self.backends.values():
+            self.bot.loop.create_task(backend.close())
+        if self._cache_saver is not None:
+            self._cache_saver.cancel()
+            self.cache.save(self.cache_file)
+
+    async def save_cache(self, interval: float):
+        """
+        Saves the cache to the cache file every
+        `interval` seconds if new results were
+        added, writing the file in an executor.
+        """
+
+        while True:
+            await asyncio.sleep(interval)
+            if not self._cache_changed:
+                continue
+            self._cache_changed = False
+            try:
+                await self.bot.loop.run_in_executor(
+                    None, self.cache.save, self.cache_file, self.cache.snapshot()
+                )
+            except OSError as err:
+                print(f'Failed to save the eval cache: {err}', file=sys.stderr)
+
+    def cache_key(self, lang: str, code: str) -> str:
+        """
+        Returns the key under which the result for
+        the given code is cached. It includes the
+        command and backend the code is evaluated
+        with, so that changing either of them
+        invalidates old results.
+        """
+
+        submission = json.dumps([lang, coliru.LANGS[lang], self.lang_backends[lang], code])
+        return hashlib.sha256(submission.encode()).hexdigest()
 
     @staticmethod
     def get_lang(code_block: str) -> str:
@@ -52,6 +176,77 @@ class Eval:
         to_newline = code_block[3:code_block.find('\n')]
         return to_newline.replace(' ', '').replace('\n', '')
 
+    @staticmethod
+    def result_embed(ctx, lang: str, result: str, footer: str) -> discord.Embed:
+        """
+        Creates the Embed showing the result of an
+        evaluation, with `footer` appended to the footer.
+        """
+
+        return discord.Embed(
+            colour=discord.Colour.blue()
+        ).add_field(
+            name='Eval Results',
+            value=f'```{lang}\n{result}```'
+        ).set_author(
+            name=ctx.message.author,
+            icon_url=ctx.message.author.avatar_url
+        ).set_footer(
+            text=f'{LANGUAGE_NAMES[lang]} Evaluation | {footer}',
+            icon_url=LANGUAGE_IMAGES[lang]
+        )
+
+    async def send_result(self, ctx, lang: str, result: str, footer: str, msg=None):
+        """
+        Sends the result of an evaluation. Short results
+        are sent as a single Embed, which replaces the
+        content of `msg` if it is given. Longer results
+        are split into pages, and sent either as a
+        PagedEmbed or, if there are too many pages,
+        as their first page along with a file.
+        """
+
+        pages = paginate(result, PAGE_SIZE)
+        if len(pages) == 1:
+            embed = self.result_embed(ctx, lang, result, footer)
+            if msg is not None:
+                await msg.edit(embed=embed)
+            else:
+                await ctx.send(embed=embed)
+            return
+
+        if msg is not None:
+            await msg.delete()
+
+        if len(pages) > len(PAGE_EMOJIS):
+            await ctx.send(
+                embed=self.result_embed(
+                    ctx, lang, pages[0], f'{footer} | Full output attached'
+                ),
+                file=discord.File(io.BytesIO(result.encode()), filename='output.txt')
+            )
+            return
+
+        embeds = [
+            self.result_embed(ctx, lang, page, f'{footer} | Page {idx}/{len(pages)}')
+            for idx, page in enumerate(pages, start=1)
+        ]
+        paged = PagedEmbed(ctx, self.bot, PAGE_EMOJIS[0], embeds[0])
+        for emoji, embed in zip(PAGE_EMOJIS[1:], embeds[1:]):
+            paged.add_page(emoji, embed)
+        await paged.send()
+
+    async def run_eval(self, lang: str, code: str):
+        """
+        Evaluates the code and returns the backend's
+        Result along with the time the evaluation took.
+        """
+
+        backend = self.backends[self.lang_backends[lang]]
+        start_time = datetime.datetime.now()
+        result = await backend.run(coliru.LANGS[lang], code)
+        return result, datetime.datetime.now() - start_time
+
     @commands.command(name='eval')
     @commands.cooldown(rate=1, per=5., type=commands.BucketType.user)
     async def eval_(self, ctx, *, code_block: str):
@@ -64,25 +259,57 @@ class Eval:
                 description=f'Known languages: {", ".join(coliru.LANGS)}',
                 colour=discord.Colour.red()
             ))
-        else:
-            code = code_block.strip('`')[len(lang):]
-            start_time = datetime.datetime.now()
-            result = await coliru.evaluate(lang, code)
-            execution_time = datetime.datetime.now() - start_time
+            return
+
+        code = code_block.strip('`')[len(lang):]
+        key = self.cache_key(lang, code)
+        result = self.cache.get(key)
+        if result is not None:
+            await self.send_result(ctx, lang, result, 'Cached result')
+            return
+
+        try:
+            future, position = self.scheduler.submit(
+                ctx.guild.id if ctx.guild is not None else ctx.author.id,
+                lambda: self.run_eval(lang, code)
+            )
+        except QueueFull:
             await ctx.send(embed=discord.Embed(
+                title='Eval: Too many evaluations queued',
+                description='Please try again in a few seconds.',
+                colour=discord.Colour.red()
+            ))
+            return
+
+        queue_msg = None
+        if position:
+            queue_msg = await ctx.send(embed=discord.Embed(
+                description=f'Your evaluation is queued at position {position}...',
                 colour=discord.Colour.blue()
-            ).add_field(
-                name='Eval Results',
-                value=f'```{lang}\n{result}```'
-            ).set_author(
-                name=ctx.message.author,
-                icon_url=ctx.message.author.avatar_url
-            ).set_footer(
-                text=(f'{LANGUAGE_NAMES[lang]} Evaluation |'
-                      f' Execution time: {str(execution_time)[:-4]}'),
-                icon_url=LANGUAGE_IMAGES[lang]
             ))
 
+        try:
+            result, execution_time = await future
+        except EvalError as err:
+            reply = discord.Embed(
+                title='Eval: Evaluation failed',
+                description=str(err),
+                colour=discord.Colour.red()
+            )
+            if queue_msg is not None:
+                await queue_msg.edit(embed=reply)
+            else:
+                await ctx.send(embed=reply)
+            return
+
+        # Timeouts may be caused by load on the host, so they are not cached
+        if not result.timed_out:
+            self.cache[key] = result.output
+            self._cache_changed = True
+        await self.send_result(
+            ctx, lang, result.output, f'Execution time: {str(execution_time)[:-4]}', queue_msg
+        )
+
 
 def setup(bot):
     """Adds the Administration cog to the Bot."""
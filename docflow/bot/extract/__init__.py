@@ -3,5 +3,15 @@ This package houses the extraction
 modules for various languages.
 """
 
+from .cpp import ReferenceNotLoaded
+from .cpp import generation as cpp_generation
+from .cpp import loaded as cpp_loaded
+from .cpp import lookup as cpp_lookup
+from .cpp import reload as cpp_reload
 from .cpp import symbol as cpp_symbol
+from .cpp import symbol_pages as cpp_symbol_pages
 from .cpp import stub as cpp_stub
+from .cpp import stub_pages as cpp_stub_pages
+from .cpp import suggest as cpp_suggest
+from .index import SymbolIndex
+from .util import get_ref_mtimes
@@ -3,119 +3,158 @@ Contains extractor functions for
 scraped data from cppreference.com.
 """
 
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 import discord
 
-from .cpp_embed import cpp_embed
-from .search import search
-from .util import get_ref
+from .index import SymbolIndex
+from .search import FuzzyIndex
+from .util import get_ref_store, get_rendered_store
 
-CPP_STUBS = get_ref("cpp_stubs.json")
-CPP_SYMBOLS = get_ref("cpp_symbols.json")
 
+class ReferenceNotLoaded(Exception):
+    """Raised when the C++ reference is used before it was loaded."""
 
-def stub(query: str) -> Optional[discord.Embed]:
+
+class CppReference:  # pylint: disable=too-few-public-methods
     """
-    Searches for the given query in the
-    C++ stub database, for example
-    "Strings Library".
+    The C++ reference stores and the stores with
+    their rendered embeds, together with the
+    search indexes built from them. Every (re)load
+    creates a new instance, which then replaces
+    the current one as a whole.
     """
 
-    names = [obj['name'] for obj in CPP_STUBS]
-    search_result = search(names, query)
-    for stub_obj in CPP_STUBS:
-        if search_result == stub_obj['name']:
-            stub_ = stub_obj
-            break
-    else:
-        return None
+    def __init__(self):
+        self.stubs = get_ref_store("cpp_stubs")
+        self.symbols = get_ref_store("cpp_symbols")
+        self.symbol_index = SymbolIndex(self.symbols, self.symbols.names)
+        self.stub_index = FuzzyIndex([names[0] for names in self.stubs.names])
+        self.stub_pages = get_rendered_store("cpp_stubs")
+        self.symbol_pages = get_rendered_store("cpp_symbols")
+
 
-    embed = cpp_embed(stub_)
-    for header in stub_['items']:
-        embed.add_field(
-            name=header,
-            value=stub_['items'][header].strip() or "Nothing found here :("
-        )
-    return embed
+# The currently used CppReference, or None until it was loaded
+REFERENCE = None
 
+# Incremented whenever the reference data is (re)loaded
+GENERATION = 0
 
-def symbol(name: str) -> Optional[List[discord.Embed]]:
+
+def reload():
     """
-    Extracts the given C++ symbol from the
-    C++ symbol index, for example std::cout.
+    Opens the reference stores, rebuilding them
+    from newer scraped reference files if needed,
+    and builds the search indexes. This blocks for
+    a while, so the bot runs it in an executor.
+    Until it returns, the previously loaded data
+    (if any) continues to be used. Anything derived
+    from the old data, such as cached replies, can
+    detect the reload through `generation()`.
+    """
+
+    global REFERENCE, GENERATION  # pylint: disable=global-statement
+
+    REFERENCE = CppReference()
+    GENERATION += 1
+
+
+def loaded() -> bool:
+    """Returns whether the reference data was loaded yet."""
+
+    return REFERENCE is not None
+
+
+def generation() -> int:
+    """Returns how often the reference data was (re)loaded."""
+
+    return GENERATION
+
+
+def get_reference() -> CppReference:
+    """
+    Returns the currently loaded reference data.
+    Raises ReferenceNotLoaded if it was not loaded yet.
+    """
+
+    reference = REFERENCE
+    if reference is None:
+        raise ReferenceNotLoaded("The C++ reference data was not loaded yet")
+    return reference
+
+
+def lookup(name: str) -> Optional[dict]:
+    """
+    Returns the raw record for the given
+    C++ symbol name, for example std::labs,
+    or None if no such symbol was scraped.
     """
 
-    def parse_function(symb: dict):
-        """Parses a function symbol, such as std::abs."""
+    return get_reference().symbol_index.get(name)
 
-        response.add_field(
-            name="Parameters",
-            value='\n'.join(symb['params']) or "No parameters found."
-        ).add_field(
-            name="Return Value",
-            value=symb['return'] or "Nothing correct values found :("
-        )
 
-        return "function"
+def suggest(name: str, count: int = 3) -> List[str]:
+    """
+    Returns up to `count` names of C++ symbols
+    which are the closest to the given name,
+    for "did you mean" hints on a failed lookup.
+    """
 
-    def parse_type(symb: dict):
-        """Parses a type symbol, such as std::vector."""
+    return get_reference().symbol_index.suggest(name, count)
 
-        types = '\n'.join(map(
-            lambda item: f"{item[0]}: {item[1]}", symb['types'].items()
-        ))[1:].replace("[edit]", "")
-        funcs = '\n'.join(map(
-            lambda item: f"{item[0]}: {item[1]}", symb['funcs'].items()
-        ))[1:].replace("(public member function) [edit]", "")
 
-        if len(types) > 1020:
-            types = types[:1020] + "..."
-        if len(funcs) > 1020:
-            funcs = funcs[:1020] + "..."
+def stub_pages(query: str) -> Optional[List[dict]]:
+    """
+    Searches for the given query in the
+    C++ stub database, for example
+    "Strings Library", and returns the
+    rendered embed dicts of the closest stub.
+    """
 
+    reference = get_reference()
+    search_result = reference.stub_index.best(query)
+    if search_result is None:
+        return None
+    return reference.stub_pages[search_result]['pages']
 
 
-        embed = cpp_embed(symb)
-        embed.add_field(
-            name="Member Types",
-            value=types
-        ).add_field(
-            name="Member Functions",
-            value=funcs
-        )
+def stub(query: str) -> Optional[discord.Embed]:
+    """
+    Searches for the given query in the
+    C++ stub database, for example
+    "Strings Library".
+    """
+
+    pages = stub_pages(query)
+    if pages is None:
+        return None
+    return discord.Embed.from_dict(pages[0])
+
 
-        return embed
+def symbol_pages(name: str) -> Optional[Tuple[List[dict], int]]:
+    """
+    Returns the rendered embed dicts of the
+    given C++ symbol, for example std::cout,
+    along with the type of the symbol, or
+    None if no such symbol was scraped.
+    """
 
-    for symbol_obj in CPP_SYMBOLS:
-        # Compatibility with Types
-        if any(n == name for n in symbol_obj['names']):
-            symb = symbol_obj
-            break
-    else:
+    reference = get_reference()
+    row = reference.symbol_index.row(name)
+    if row is None:
         return None
+    rendered = reference.symbol_pages[row]
+    return rendered['pages'], rendered['type']
 
 
+def symbol(name: str) -> Optional[Tuple[List[discord.Embed], int]]:
+    """
+    Extracts the given C++ symbol from the
+    C++ symbol index, for example std::cout.
+    """
 
-    response = cpp_embed(symb)
-    signature = "```cpp\n" + ''.join(symb['sigs']) + "```"
-    if symb['header']:
-        backticked_headers = map(lambda header: '`%s`' % header, symb['header'])
-        headers = ', '.join(backticked_headers)
-    else:
-        headers = 'No definition found.'
-    response.add_field(
-        name="Signature",
-        value=signature
-    ).add_field(
-        name="Defined in Header(s)",
-        value=headers
-    )
-
-    # Mapping for the symbol types and the parser functions
-    members = {
-        0: parse_function,
-        1: parse_type,
-    }[symb['type']](symb)
-
-    return [response, members], symb['type']
+    result = symbol_pages(name)
+    if result is None:
+        return None
+    pages, symbol_type = result
+    return [discord.Embed.from_dict(page) for page in pages], symbol_type
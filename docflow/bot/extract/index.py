@@ -0,0 +1,123 @@
+"""
+Contains the SymbolIndex, which maps
+every name of a scraped C++ symbol to
+its record so that exact lookups do not
+have to scan the whole reference.
+"""
+
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from .search import FuzzyIndex
+
+
+def split_names(names: Iterable[str]) -> Iterator[str]:
+    """
+    Yields every single name found in the
+    `names` of a symbol record. Pages that
+    document several functions at once may
+    contain entries such as "std::abs, std::labs",
+    which are split up into separate names here.
+    Names without a namespace are prefixed with
+    "std::", just like the spider does.
+    """
+
+    for entry in names:
+        for name in entry.split(','):
+            name = name.strip()
+            if not name:
+                continue
+            if not name.startswith("std::"):
+                name = "std::" + name
+            yield name
+
+
+class SymbolIndex:
+    """
+    A lookup table for C++ symbol records,
+    keyed on every name and alias of a symbol.
+
+    The index is built once from a sequence
+    of records, along with a FuzzyIndex over all
+    names for suggestions when a lookup misses,
+    and can be rebuilt with new data
+    through `rebuild`. The new table is built
+    completely before it replaces the old one,
+    so readers always see either the old or
+    the new data, never a mixture of both.
+
+    The index only stores the position of each
+    record, so records of a ReferenceStore are
+    only decoded once they are looked up.
+
+    Example:
+
+        index = SymbolIndex(get_ref("cpp_symbols.json"))
+        index.get("std::labs")  # the record for std::abs
+        index.suggest("std::vectr")  # ["std::vector", ...]
+    """
+
+    def __init__(self, records: Sequence[dict] = (),
+                 record_names: Sequence[List[str]] = None):
+        self._state = ([], {}, FuzzyIndex([]))
+        self.rebuild(records, record_names)
+
+    def rebuild(self, records: Sequence[dict], record_names: Sequence[List[str]] = None):
+        """
+        Rebuilds the index from the given records.
+        `record_names` holds the `names` of every
+        record; if it is omitted, the names are
+        read from the records themselves. If several
+        records share a name, the first one wins,
+        which matches the behaviour of the linear
+        search this index replaces.
+        """
+
+        if record_names is None:
+            record_names = [record['names'] for record in records]
+        names = {}
+        for row, entries in enumerate(record_names):
+            for name in split_names(entries):
+                names.setdefault(name, row)
+
+        # A single assignment swaps the records, names and fuzzy index
+        self._state = (records, names, FuzzyIndex(list(names)))
+
+    def row(self, name: str) -> Optional[int]:
+        """
+        Returns the position of the record for the
+        given name, or None if the name is unknown.
+        """
+
+        return self._state[1].get(name)
+
+    def get(self, name: str) -> Optional[dict]:
+        """Returns the record for the given name, or None if it is unknown."""
+
+        records, names, _ = self._state
+        row = names.get(name)
+        return None if row is None else records[row]
+
+    def suggest(self, name: str, count: int = 3) -> List[str]:
+        """
+        Returns up to `count` known names that
+        are closest to the given name, best first.
+        """
+
+        return [item for item, _ in self._state[2].top(name, count)]
+
+    def names(self) -> List[str]:
+        """Returns a list of all names known to this index."""
+
+        return list(self._state[1])
+
+    @property
+    def records(self) -> Sequence[dict]:
+        """The records this index was built from."""
+
+        return self._state[0]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._state[1]
+
+    def __len__(self) -> int:
+        return len(self._state[1])
@@ -0,0 +1,148 @@
+"""
+Contains the functions which render scraped
+C++ records into the embeds the bot replies
+with, as dicts for discord.Embed.from_dict.
+
+Rendering happens when the reference stores
+are built: next to every reference store, a
+store with the rendered embeds of each of its
+records in the same order is written, so that
+a lookup only has to decode the embeds of the
+record it found. The rendered embeds are cut
+to Discord's size limits.
+"""
+
+from .cpp_embed import cpp_embed
+
+# Discord's size limits for the parts of an embed
+TITLE_LIMIT = 256
+DESCRIPTION_LIMIT = 2048
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+FIELD_COUNT_LIMIT = 25
+TOTAL_LIMIT = 6000
+
+# The value of fields which would otherwise be empty, which Discord rejects
+EMPTY_FIELD = "Nothing found here :("
+
+
+def shorten(text: str, limit: int) -> str:
+    """Cuts `text` to at most `limit` characters, ending it with "..." if it was cut."""
+
+    if len(text) <= limit:
+        return text
+    return text[:limit - 3] + "..."
+
+
+def embed_size(embed: dict) -> int:
+    """Returns the number of characters of an embed dict, as Discord counts them."""
+
+    return (
+        len(embed.get('title', ''))
+        + len(embed.get('description', ''))
+        + len(embed.get('author', {}).get('name', ''))
+        + len(embed.get('footer', {}).get('text', ''))
+        + sum(len(field['name']) + len(field['value']) for field in embed.get('fields', ()))
+    )
+
+
+def fit_embed(embed: dict) -> dict:
+    """
+    Cuts the parts of an embed dict to Discord's
+    limits and fills in empty field values.
+    Fields which do not fit into the total
+    limit anymore are dropped from the end.
+    """
+
+    if 'title' in embed:
+        embed['title'] = shorten(embed['title'], TITLE_LIMIT)
+    if 'description' in embed:
+        embed['description'] = shorten(embed['description'], DESCRIPTION_LIMIT)
+    if 'author' in embed:
+        embed['author']['name'] = shorten(embed['author']['name'], TITLE_LIMIT)
+
+    fields = embed.get('fields', [])[:FIELD_COUNT_LIMIT]
+    for field in fields:
+        field['name'] = shorten(field['name'], FIELD_NAME_LIMIT) or EMPTY_FIELD
+        value = field['value'] if field['value'].strip() else EMPTY_FIELD
+        field['value'] = shorten(value, FIELD_VALUE_LIMIT)
+    if fields:
+        embed['fields'] = fields
+        while embed_size(embed) > TOTAL_LIMIT and len(fields) > 1:
+            fields.pop()
+    return embed
+
+
+def render_symbol(symb: dict) -> dict:
+    """
+    Renders a C++ symbol record. Returns a dict
+    with the `names` and `type` of the symbol,
+    and its `pages`. Functions have a single page
+    with their signature, headers, parameters and
+    return value, while types have a page with
+    their signature and headers, followed by a
+    page with their member types and functions.
+    """
+
+    if symb['header']:
+        headers = ', '.join(f'`{header}`' for header in symb['header'])
+    else:
+        headers = 'No definition found.'
+
+    overview = cpp_embed(symb).add_field(
+        name="Signature",
+        value="```cpp\n" + shorten(''.join(symb['sigs']), FIELD_VALUE_LIMIT - 11) + "```"
+    ).add_field(
+        name="Defined in Header(s)",
+        value=headers
+    )
+    pages = [overview]
+
+    if symb['type'] == 0:
+        overview.add_field(
+            name="Parameters",
+            value='\n'.join(symb['params']) or "No parameters found."
+        ).add_field(
+            name="Return Value",
+            value=symb['return'] or "Nothing correct values found :("
+        )
+    else:
+        types = '\n'.join(
+            f"{name}: {desc}" for name, desc in symb['types'].items()
+        )[1:].replace("[edit]", "")
+        funcs = '\n'.join(
+            f"{name}: {desc}" for name, desc in symb['funcs'].items()
+        )[1:].replace("(public member function) [edit]", "")
+        pages.append(cpp_embed(symb).add_field(
+            name="Member Types",
+            value=types
+        ).add_field(
+            name="Member Functions",
+            value=funcs
+        ))
+
+    return {
+        'names': symb['names'],
+        'type': symb['type'],
+        'pages': [fit_embed(page.to_dict()) for page in pages]
+    }
+
+
+def render_stub(stub: dict) -> dict:
+    """
+    Renders a C++ stub record. Returns a dict
+    with the `name` of the stub and its `pages`,
+    a single embed with a field for each item.
+    """
+
+    embed = cpp_embed(stub)
+    for header, text in stub['items'].items():
+        embed.add_field(name=header, value=text.strip())
+    return {'name': stub['name'], 'pages': [fit_embed(embed.to_dict())]}
+
+
+# The render function for the records of every reference store
+RENDERERS = {
+    "cpp_symbols": render_symbol,
+    "cpp_stubs": render_stub
+}
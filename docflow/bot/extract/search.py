@@ -1,11 +1,30 @@
 """
 Utility module for finding the Levenshtein
 distance/ratio between two strings and using
-it to search a list for a query
+it to search a list for a query.
+
+`levenshtein`, `ratio` and `search` compare
+one pair of strings at a time. For searching
+the same list of items over and over again,
+the `Matcher` encodes the items once and
+then scores all of them against a query at
+the same time, and the `FuzzyIndex` narrows
+the items down through their trigrams first.
 """
 
+from typing import List, Optional, Sequence, Set, Tuple
+
 import numpy as np
 
+# Used to pad the encoded items, never equal to a code point
+PADDING = -1
+
+# Compact the candidate arrays once this fraction of them was pruned
+COMPACT_THRESHOLD = 0.75
+
+# How many items a FuzzyIndex scores exactly for a query
+CANDIDATE_LIMIT = 256
+
 
 def levenshtein(source, target):
     """Returns the Levenshtein distance between source and target"""
@@ -46,3 +65,244 @@ def search(items, query):
 
     item_ratios = ((item, ratio(item, query)) for item in items)
     return min(item_ratios, key=lambda r: r[1])[0]
+
+
+def encode(string: str) -> np.ndarray:
+    """Returns the code points of the given string as an array."""
+
+    return np.frombuffer(string.encode('utf-32-le'), dtype='<u4').astype(np.int32)
+
+
+class Matcher:
+    """
+    Finds the items with the lowest Levenshtein
+    ratio to a query, just like `search` does,
+    but for all items at once.
+
+    The items are encoded into a padded matrix
+    of code points when the Matcher is created.
+    A query then fills in the Levenshtein table
+    one query character at a time for every item
+    in parallel through NumPy, so the Python loop
+    only runs over the characters of the query.
+
+    After every query character, a lower bound
+    (the smallest value in the row of the table)
+    and an upper bound (the current distance plus
+    the remaining characters of the query) of the
+    final ratio is known for every item. Items
+    whose lower bound exceeds the k-th best upper
+    bound can not make it into the results anymore
+    and are dropped.
+
+    Example:
+
+        matcher = Matcher(["Strings library", "Containers library"])
+        matcher.search("string lib")  # "Strings library"
+    """
+
+    def __init__(self, items: Sequence[str]):
+        self.items = list(items)
+        self._lengths = np.array([len(item) for item in self.items], dtype=np.int32)
+        width = int(self._lengths.max()) if self.items else 0
+
+        self._codes = np.full((len(self.items), width), PADDING, dtype=np.int32)
+        for row, item in enumerate(self.items):
+            self._codes[row, :len(item)] = encode(item)
+
+    def top(self, query: str, count: int = 1,  # pylint: disable=too-many-locals
+            rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Returns up to `count` pairs of item indices
+        and Levenshtein ratios, sorted by ratio.
+        Ties are resolved in favour of the item
+        that comes first, like `search` does.
+
+        If `rows` is given, only the items with
+        these indices are considered.
+        """
+
+        rows = np.arange(len(self.items)) if rows is None else np.sort(rows)
+        if not rows.size or count < 1:
+            return []
+
+        target = encode(query)
+        lengths = self._lengths[rows]
+        width = int(lengths.max())
+        codes = self._codes[rows, :width]
+        ratio_base = np.maximum(np.maximum(lengths, target.size), 1).astype(np.float64)
+
+        # Distances from the empty query prefix to every prefix of every item
+        cols = np.arange(width + 1, dtype=np.int32)
+        prev_rows = np.tile(cols, (rows.size, 1))
+
+        for idx, char in enumerate(target, 1):
+            curr_rows = np.empty_like(prev_rows)
+            curr_rows[:, 0] = idx
+            np.minimum(  # pylint: disable=no-member
+                prev_rows[:, 1:] + 1,
+                prev_rows[:, :-1] + (codes != char),
+                out=curr_rows[:, 1:]
+            )
+            # Insertions: curr[j] = min over k <= j of curr[k] + (j - k)
+            curr_rows = np.minimum.accumulate(  # pylint: disable=no-member
+                curr_rows - cols, axis=1
+            ) + cols
+            prev_rows = curr_rows
+
+            if rows.size <= count:
+                continue
+
+            # Values past the end of an item can never reach its final cell
+            in_item = cols <= lengths[:, np.newaxis]
+            lower = np.where(in_item, prev_rows, np.iinfo(np.int32).max).min(axis=1)
+            upper = prev_rows[np.arange(rows.size), lengths] + (target.size - idx)
+            bound = np.partition(upper / ratio_base, count - 1)[count - 1]
+            keep = lower / ratio_base <= bound
+
+            if np.count_nonzero(keep) <= COMPACT_THRESHOLD * rows.size:
+                rows, lengths, ratio_base = rows[keep], lengths[keep], ratio_base[keep]
+                width = int(lengths.max())
+                codes = codes[keep, :width]
+                prev_rows = prev_rows[keep, :width + 1]
+                cols = cols[:width + 1]
+
+        ratios = prev_rows[np.arange(rows.size), lengths] / ratio_base
+        order = np.lexsort((rows, ratios))[:count]
+        return [(int(rows[i]), float(ratios[i])) for i in order]
+
+    def best(self, query: str) -> Optional[int]:
+        """
+        Returns the index of the item with the
+        lowest Levenshtein ratio to the query,
+        or None if the Matcher has no items.
+        """
+
+        result = self.top(query)
+        return result[0][0] if result else None
+
+    def search(self, query: str) -> Optional[str]:
+        """
+        Returns the item with the lowest
+        Levenshtein ratio to the query, or
+        None if the Matcher has no items.
+        """
+
+        best = self.best(query)
+        return None if best is None else self.items[best]
+
+
+def trigrams(string: str) -> Set[str]:
+    """
+    Returns the set of character trigrams of
+    the given string. The string is lowercased
+    and padded so that its start and end also
+    form trigrams of their own.
+    """
+
+    padded = f"  {string.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:  # pylint: disable=too-few-public-methods
+    """
+    An inverted index from character trigrams
+    to the items containing them. Used to narrow
+    a query down to the few items that share
+    the most trigrams with it before they are
+    scored exactly.
+    """
+
+    def __init__(self, items: Sequence[str]):
+        postings = {}
+        item_trigrams = []
+        for row, item in enumerate(items):
+            grams = trigrams(item)
+            item_trigrams.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(row)
+
+        self._postings = {
+            gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()
+        }
+        self._trigram_counts = np.array(item_trigrams, dtype=np.int32)
+
+    def candidates(self, query: str, limit: int) -> np.ndarray:
+        """
+        Returns the indices of up to `limit` items
+        which are most similar to the query, as
+        measured by the Jaccard similarity of their
+        trigram sets. Items without any trigram in
+        common with the query are never returned.
+        """
+
+        grams = trigrams(query)
+        matches = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not matches:
+            return np.empty(0, dtype=np.int32)
+
+        shared = np.bincount(np.concatenate(matches), minlength=self._trigram_counts.size)
+        rows = np.flatnonzero(shared)
+        if rows.size <= limit:
+            return rows
+
+        shared = shared[rows]
+        similarity = shared / (self._trigram_counts[rows] + len(grams) - shared)
+        return rows[np.argpartition(-similarity, limit - 1)[:limit]]
+
+
+class FuzzyIndex:
+    """
+    Combines a TrigramIndex with a Matcher:
+    a query is first narrowed down to at most
+    `candidates` items through their trigrams,
+    which are then ranked by their Levenshtein
+    ratio. If no item shares a trigram with the
+    query, all items are ranked instead.
+
+    Since the trigram step is a heuristic, the
+    best result may in rare cases differ from
+    the one `search` finds over all items.
+
+    Example:
+
+        index = FuzzyIndex(["std::vector", "std::valarray", "std::move"])
+        index.top("std::vectr", 2)  # [("std::vector", 0.09...), ...]
+    """
+
+    def __init__(self, items: Sequence[str], candidates: int = CANDIDATE_LIMIT):
+        self.matcher = Matcher(items)
+        self.trigrams = TrigramIndex(self.matcher.items)
+        self.candidates = candidates
+
+    @property
+    def items(self) -> List[str]:
+        """The items this index was built from."""
+
+        return self.matcher.items
+
+    def top_indices(self, query: str, count: int = 1) -> List[Tuple[int, float]]:
+        """
+        Returns up to `count` pairs of item indices
+        and Levenshtein ratios, sorted by ratio.
+        """
+
+        rows = self.trigrams.candidates(query, max(self.candidates, count))
+        return self.matcher.top(query, count, rows if rows.size else None)
+
+    def top(self, query: str, count: int = 1) -> List[Tuple[str, float]]:
+        """
+        Returns up to `count` pairs of items and
+        Levenshtein ratios, sorted by ratio.
+        """
+
+        return [(self.items[row], score) for row, score in self.top_indices(query, count)]
+
+    def best(self, query: str) -> Optional[int]:
+        """
+        Returns the index of the closest item
+        to the query, or None if there are no items.
+        """
+
+        result = self.top_indices(query)
+        return result[0][0] if result else None
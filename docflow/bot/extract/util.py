@@ -6,6 +6,9 @@ for the extraction package.
 import os
 import json
 
+from ..util.store import ReferenceStore, build_store
+from .render import RENDERERS
+
 
 def get_ref_path(filename: str) -> str:
     """
@@ -18,11 +21,95 @@ def get_ref_path(filename: str) -> str:
     )
 
 
+def get_ref_mtimes() -> dict:
+    """
+    Returns the modification times of all
+    scraped reference files and reference
+    stores, keyed on their file names. Files
+    which disappear while they are listed are
+    skipped.
+    """
+
+    ref_dir = get_ref_path("")
+    if not os.path.isdir(ref_dir):
+        return {}
+
+    mtimes = {}
+    for entry in os.scandir(ref_dir):
+        if not entry.name.endswith((".json", ".ref")):
+            continue
+        try:
+            mtimes[entry.name] = entry.stat().st_mtime
+        except FileNotFoundError:
+            # Removed or replaced by a running scrape since it was listed
+            continue
+    return mtimes
+
+
 def get_ref(filename: str) -> dict:
     """
     Returns the parsed contents of a reference file
     to be kept in memory for faster access.
     """
 
-    with open(get_ref_path(filename), 'r') as ref:
+    with open(get_ref_path(filename), 'r', encoding='utf-8') as ref:
         return json.load(ref)
+
+
+def build_ref_store(name: str):
+    """
+    Converts the scraped reference file `name`.json
+    into the compact store `name`.ref next to it.
+    """
+
+    build_store(get_ref(name + ".json"), get_ref_path(name + ".ref"))
+
+
+def get_ref_store(name: str) -> ReferenceStore:
+    """
+    Opens the reference store `name`.ref, for
+    example "cpp_symbols". If the store does not
+    exist yet or is older than the scraped reference
+    file it is built from, it is (re)built first.
+    """
+
+    json_path = get_ref_path(name + ".json")
+    store_path = get_ref_path(name + ".ref")
+    if not os.path.exists(store_path) or (
+            os.path.exists(json_path)
+            and os.path.getmtime(json_path) > os.path.getmtime(store_path)):
+        build_ref_store(name)
+    return ReferenceStore(store_path)
+
+
+def build_rendered_store(name: str):
+    """
+    Renders every record of the reference store
+    `name`.ref into its embeds and writes them
+    into the store `name`_embeds.ref next to it,
+    in the same order as the records.
+    """
+
+    render = RENDERERS[name]
+    records = get_ref_store(name)
+    try:
+        build_store(map(render, records), get_ref_path(name + "_embeds.ref"))
+    finally:
+        records.close()
+
+
+def get_rendered_store(name: str) -> ReferenceStore:
+    """
+    Opens the store with the rendered embeds of
+    the reference store `name`.ref. If it does
+    not exist yet or is older than the reference
+    store, it is (re)built first.
+    """
+
+    store_path = get_ref_path(name + "_embeds.ref")
+    ref_path = get_ref_path(name + ".ref")
+    if not os.path.exists(store_path) or (
+            os.path.exists(ref_path)
+            and os.path.getmtime(ref_path) > os.path.getmtime(store_path)):
+        build_rendered_store(name)
+    return ReferenceStore(store_path)
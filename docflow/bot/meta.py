@@ -3,6 +3,7 @@
 import discord
 
 from discord.ext import commands
+from .util.paged_embed import ReactionDispatcher
 
 SECONDS_IN_A_DAY = 86400
 
@@ -64,6 +65,29 @@ class Meta:
                    f'**Uptime**: {self.get_readable_uptime()}')
         ).colour = discord.Colour.blue()
 
+        startup = f'**Ready after**: {self.bot.startup_time}'
+        doc_search = self.bot.get_cog('DocSearch')
+        if doc_search is not None:
+            if doc_search.load_time is not None:
+                startup += f'\n**Reference loaded in**: {doc_search.load_time:.2f}s'
+            stats.add_field(
+                name='Documentation Cache',
+                value=str(doc_search.cache)
+            )
+        stats.add_field(name='Startup', value=startup)
+
+        eval_cog = self.bot.get_cog('Eval')
+        if eval_cog is not None:
+            stats.add_field(
+                name='Eval Cache',
+                value=str(eval_cog.cache)
+            )
+
+        stats.add_field(
+            name='Paged Replies: Time to Interactive',
+            value=ReactionDispatcher.for_bot(self.bot).time_to_interactive()
+        )
+
         await ctx.send(embed=stats)
 
     @commands.command()
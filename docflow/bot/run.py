@@ -8,6 +8,8 @@ import json
 import discord
 from discord.ext import commands
 
+from .util.paged_embed import ReactionDispatcher
+
 DESCRIPTION = 'Hello! I am a Bot providing code eval and documentation search.'
 COGS_ON_LOGIN = [
     'admin',
@@ -20,12 +22,17 @@ COGS_ON_LOGIN = [
 class Bot(commands.AutoShardedBot):
     """
     A subclass of Discord's Bot to provide additional attributes
-    such as uptime.
+    such as uptime and the configuration from config.json,
+    which Cogs can use to read their settings.
     """
 
-    def __init__(self, command_prefix, **options):
+    def __init__(self, command_prefix, config: dict = None, **options):
         super().__init__(command_prefix, **options)
         self.start_time = datetime.datetime.utcnow()
+        self.startup_time = None
+        self.config = config or {}
+        # Handles reactions to paged Embeds, including those sent before a restart
+        ReactionDispatcher.for_bot(self)
 
     @property
     def uptime(self) -> datetime.timedelta:
@@ -33,10 +40,17 @@ class Bot(commands.AutoShardedBot):
 
         return datetime.datetime.utcnow() - self.start_time
 
-    @staticmethod
-    async def on_ready():
-        """The on_ready Event, emitted by Discord."""
-        print('Logged in.')
+    async def on_ready(self):
+        """
+        The on_ready Event, emitted by Discord.
+        The time it took from starting the Bot
+        until the first on_ready is kept as
+        the Bot's `startup_time`.
+        """
+
+        if self.startup_time is None:
+            self.startup_time = datetime.datetime.utcnow() - self.start_time
+        print(f'Logged in after {self.startup_time.total_seconds():.2f}s.')
 
     @staticmethod
     async def on_command_error(ctx, error):  # pylint: disable=arguments-differ
@@ -96,14 +110,15 @@ def start():
     function will simply call this function.
     """
 
-    bot = Bot(command_prefix='.', description=DESCRIPTION, pm_help=None)
+    with open("config.json", encoding="utf-8") as config_file:
+        config = json.load(config_file)
+
+    bot = Bot(command_prefix='.', config=config, description=DESCRIPTION, pm_help=None)
 
     for cog in COGS_ON_LOGIN:
         bot.load_extension("docflow.bot." + cog)
 
-    with open("config.json") as config_file:
-        token = json.load(config_file)['discord_token']
-    bot.run(token)
+    bot.run(config['discord_token'])
 
 
 if __name__ == '__main__':
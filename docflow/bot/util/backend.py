@@ -0,0 +1,67 @@
+"""
+Contains the interface that evaluation
+backends implement. A backend receives
+the command to evaluate the code with,
+as found in `coliru.LANGS`, along with the
+source code, which the command expects to
+find in a file named `main.cpp`.
+
+Currently, there are two backends:
+    - coliru.Coliru, which sends the code to Coliru
+    - local.LocalBackend, which runs the code in
+      resource-limited local processes
+"""
+
+from typing import NamedTuple
+
+# Appended to the output of evaluations which a backend aborted after the given seconds
+TIMEOUT_NOTICE = '\n[Timed out after {} seconds]'
+
+
+class Result(NamedTuple):
+    """
+    The result of an evaluation: the output, and
+    whether the backend aborted the evaluation
+    because it took too long. This is set by the
+    backend itself, so it cannot be faked by
+    code which prints the TIMEOUT_NOTICE.
+    """
+
+    output: str
+    timed_out: bool = False
+
+
+class EvalError(Exception):
+    """
+    Raised when a backend fails to evaluate code,
+    for example because it could not be reached.
+    This is not raised when the evaluated code
+    itself fails to compile or run.
+    """
+
+
+class Backend:
+    """
+    The base class for evaluation backends.
+    Subclasses must implement `run`, and
+    may override `start` and `close` to set
+    up and release resources they hold.
+    """
+
+    # The name of the backend, as used in the configuration
+    name = None
+
+    async def start(self):
+        """Prepares the backend for use. Does nothing by default."""
+
+    async def run(self, cmd: str, src: str) -> Result:
+        """
+        Runs the command `cmd` with the source
+        code `src` stored in `main.cpp` and returns
+        the Result. Raises EvalError on failure.
+        """
+
+        raise NotImplementedError
+
+    async def close(self):
+        """Releases all resources of the backend. Does nothing by default."""
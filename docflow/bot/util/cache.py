@@ -0,0 +1,148 @@
+"""
+Contains a small least-recently-used
+cache which keeps track of how often
+it was hit or missed, used to store
+rendered replies for frequent queries,
+as well as a variant of it whose entries
+expire and which can be saved to disk.
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """
+    A mapping with a maximum size that evicts
+    the least recently used entry when a new
+    entry would exceed it. Every lookup through
+    `get` counts as either a hit or a miss.
+
+    Example:
+
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')  # 1, 'a' is now the most recently used
+        cache['c'] = 3  # evicts 'b'
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("The maximum size of a cache must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value stored for `key` and marks
+        it as recently used, or returns `default`
+        if the key is not in the cache.
+        """
+
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Removes all entries. The hit and miss counters are kept."""
+
+        self._entries.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        """The fraction of lookups that were hits, or 0 without any lookups."""
+
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (f'{len(self)}/{self.maxsize} entries, {self.hits} hits, '
+                f'{self.misses} misses ({self.hit_ratio:.0%} hit ratio)')
+
+
+class TTLCache(LRUCache):
+    """
+    An LRUCache whose entries expire `ttl`
+    seconds after they were stored. Expired
+    entries are dropped when they are looked up.
+
+    The entries can be saved to and loaded
+    from a JSON file through `save` and `load`,
+    in which case both the keys and the values
+    must be serializable to JSON.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= time.time():
+            del self._entries[key]
+
+        entry = super().get(key)
+        return default if entry is None else entry[0]
+
+    def __setitem__(self, key: Hashable, value: Any):
+        super().__setitem__(key, (value, time.time() + self.ttl))
+
+    def snapshot(self) -> list:
+        """Returns all entries which did not expire yet, in the form written by `save`."""
+
+        now = time.time()
+        return [
+            [key, value, expires]
+            for key, (value, expires) in self._entries.items() if expires > now
+        ]
+
+    def save(self, path: str, entries: list = None):
+        """
+        Writes all entries which did not expire yet
+        to the given file. To write the file in
+        another thread, pass the `snapshot` taken
+        beforehand as `entries`.
+        """
+
+        if entries is None:
+            entries = self.snapshot()
+        with open(path + ".tmp", 'w', encoding='utf-8') as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(path + ".tmp", path)
+
+    def load(self, path: str):
+        """
+        Adds the entries which did not expire
+        yet from a file written by `save`.
+        """
+
+        with open(path, encoding='utf-8') as cache_file:
+            entries = json.load(cache_file)
+
+        now = time.time()
+        for key, value, expires in entries:
+            if expires > now:
+                LRUCache.__setitem__(self, key, (value, expires))
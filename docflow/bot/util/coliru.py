@@ -1,14 +1,37 @@
 """
-Contains a function `evaluate`
-which sends a POST request to the
-Coliru API and returns the result
-of the evaluated code.
+Contains a client for the Coliru API,
+which sends code to Coliru to be evaluated
+and returns the result.
+
+The client keeps a single aiohttp session
+with a pool of keep-alive connections,
+so that subsequent evaluations do not have
+to set up a new connection to Coliru.
+
+Responses are read as a stream into a
+BoundedOutput, so that the memory used for
+a response is bounded regardless of how much
+output the evaluated program produced.
+
+Coliru does not report timeouts separately,
+but servers implementing the same protocol,
+such as the one in coliru_server.py, can set
+the TIMED_OUT_HEADER on their response.
 """
 
+import asyncio
 import json
 
 import aiohttp
 
+from .backend import Backend, EvalError, Result
+from .output import DEFAULT_WINDOW, BoundedOutput
+
+COLIRU_URL = 'http://coliru.stacked-crooked.com/compile'
+
+# Set to "1" by servers which aborted the evaluation because it took too long
+TIMED_OUT_HEADER = 'X-Timed-Out'
+
 LANGS = {
     'c':     'mv main.cpp main.c && gcc -std=c11 -Wall -Wextra -pthread main.c && ./a.out',
     'cpp':   'g++ -std=c++1z -Wall -Wextra -pthread main.cpp && ./a.out',
@@ -21,34 +44,129 @@ LANGS = {
 }
 
 
-async def post(cmd: str, src: str):
-    """
-    Sends a POST request to the Coliru API
-    with the specified compilation command
-    and the given source code. Returns the result.
+class Coliru(Backend):
     """
+    A client for the Coliru API, usable as
+    an evaluation backend.
+
+    The underlying aiohttp.ClientSession is
+    created on first use and reused for all
+    requests until `close` is called.
 
-    data = json.dumps({'cmd': cmd, 'src': src})
-    async with aiohttp.ClientSession() as cs:  # pylint: disable=invalid-name
-        async with cs.post('http://coliru.stacked-crooked.com/compile', data=data) as res:
-            return await res.text()
+    Arguments:
+        url : str
+            The URL of the compile endpoint, which
+            can be changed to use a server that
+            implements the same protocol, such as
+            the one in coliru_server.py.
+        limit_per_host : int
+            How many connections to Coliru may
+            be open at the same time.
+        timeout : float
+            After how many seconds a request is
+            aborted with an asyncio.TimeoutError.
+        keepalive_timeout : float
+            How many seconds an idle connection
+            is kept open for reuse.
+        max_output : int
+            After how many bytes the response
+            is no longer read.
+        window : int
+            How many bytes are kept from the
+            start and the end of the response.
 
+    Example:
 
-async def evaluate(lang: str, src: str):
+        client = Coliru(timeout=20)
+        result = await client.evaluate('py', 'print("Hello!")')
+        await client.close()
     """
-    Evaluate Code using the Coliru API.
 
-    `lang` is the syntax highlighter that was used -
-    see the dictionary LANGS' keys.
-    `src` is the source code that should be evaluated.
+    name = 'coliru'
 
-    Note that
-        - C is compiled with the C 11 standard
-        - C++ is compiled with the C++ 17 standard
-        - Python is always Python 3
-    """
+    def __init__(self, url: str = COLIRU_URL,  # pylint: disable=too-many-arguments
+                 limit_per_host: int = 4, timeout: float = 30.0,
+                 keepalive_timeout: float = 60.0, max_output: int = 1024 * 1024,
+                 window: int = DEFAULT_WINDOW):
+        self.url = url
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.max_output = max_output
+        self.window = window
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, which is created if it does not exist yet."""
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            ))
+        return self._session
+
+    async def post(self, cmd: str, src: str) -> str:
+        """
+        Sends a POST request to the Coliru API
+        with the specified compilation command
+        and the given source code. Returns the result,
+        shortened to its head and tail if it is long.
+        Raises EvalError if the request failed.
+        """
+
+        return (await self._request(cmd, src)).output
+
+    async def _request(self, cmd: str, src: str) -> Result:
+        """
+        Sends the POST request for `post` and
+        returns the output along with whether the
+        server reported that the evaluation timed out.
+        """
+
+        async def request():
+            data = json.dumps({'cmd': cmd, 'src': src})
+            output = BoundedOutput(self.max_output, self.window)
+            async with self.session.post(self.url, data=data) as res:
+                timed_out = res.headers.get(TIMED_OUT_HEADER) == '1'
+                async for chunk in res.content.iter_chunked(4096):
+                    if not output.feed(chunk):
+                        break
+            return Result(output.text(), timed_out)
+
+        try:
+            return await asyncio.wait_for(request(), self.timeout)
+        except asyncio.TimeoutError as err:
+            raise EvalError("The request to Coliru timed out.") from err
+        except aiohttp.ClientError as err:
+            raise EvalError(f"The request to Coliru failed: {err}") from err
+
+    async def run(self, cmd: str, src: str) -> Result:
+        return await self._request(cmd, src)
+
+    async def evaluate(self, lang: str, src: str):
+        """
+        Evaluate Code using the Coliru API.
+
+        `lang` is the syntax highlighter that was used -
+        see the dictionary LANGS' keys.
+        `src` is the source code that should be evaluated.
+
+        Note that
+            - C is compiled with the C 11 standard
+            - C++ is compiled with the C++ 17 standard
+            - Python is always Python 3
+        """
+
+        lang_cmd = LANGS.get(lang, None)
+        if lang_cmd is None:
+            return None
+        return await self.post(lang_cmd, src)
+
+    async def close(self):
+        """Closes the session along with all pooled connections."""
 
-    lang_cmd = LANGS.get(lang, None)
-    if lang_cmd is None:
-        return None
-    return await post(lang_cmd, src)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
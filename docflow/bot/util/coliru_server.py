@@ -0,0 +1,101 @@
+"""
+A stand-in for the Coliru API, which
+evaluates code through the LocalBackend.
+
+It implements the `/compile` endpoint the
+same way Coliru does: the request body is
+a JSON object with the keys `cmd` and `src`,
+and the response is the plain text output.
+Evaluations which timed out are marked with
+the `coliru.TIMED_OUT_HEADER`.
+This makes it possible to test the Coliru
+client without sending requests to Coliru.
+
+Start it from the root directory through
+    python3 -m docflow.bot.util.coliru_server [port] [--host HOST]
+and set `url` in the `coliru` section of the
+configuration to http://localhost:<port>/compile.
+
+The server has no authentication, so it only
+listens on localhost unless another host is
+given, and only runs the commands in
+`coliru.LANGS`.
+"""
+
+import argparse
+import json
+
+from aiohttp import web
+
+from .backend import EvalError
+from .coliru import LANGS, TIMED_OUT_HEADER
+from .local import LocalBackend
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# The commands the server runs, as sent by the Coliru client
+COMMANDS = frozenset(LANGS.values())
+
+
+async def compile_(request: web.Request) -> web.Response:
+    """Handles a request to the /compile endpoint."""
+
+    try:
+        data = json.loads(await request.text())
+        cmd, src = data['cmd'], data['src']
+    except (ValueError, KeyError, TypeError):
+        return web.Response(status=400, text="Expected a JSON object with 'cmd' and 'src'.")
+    if cmd not in COMMANDS:
+        return web.Response(status=400, text="Unsupported command.")
+
+    try:
+        result = await request.app['backend'].run(cmd, src)
+    except EvalError as err:
+        return web.Response(status=500, text=str(err))
+    if result.timed_out:
+        return web.Response(text=result.output, headers={TIMED_OUT_HEADER: '1'})
+    return web.Response(text=result.output)
+
+
+async def start_backend(app: web.Application):
+    """Starts the workers of the backend when the server starts."""
+
+    await app['backend'].start()
+
+
+async def close_backend(app: web.Application):
+    """Stops the workers of the backend when the server shuts down."""
+
+    await app['backend'].close()
+
+
+def make_app(backend: LocalBackend = None) -> web.Application:
+    """Creates the server application, evaluating code through `backend`."""
+
+    app = web.Application()
+    app['backend'] = backend or LocalBackend()
+    app.router.add_post('/compile', compile_)
+    app.on_startup.append(start_backend)
+    app.on_cleanup.append(close_backend)
+    return app
+
+
+def main():
+    """Parses the command line arguments and runs the server."""
+
+    parser = argparse.ArgumentParser(
+        prog='python3 -m docflow.bot.util.coliru_server',
+        description="Serves the Coliru API, evaluating code locally."
+    )
+    parser.add_argument('port', nargs='?', type=int, default=DEFAULT_PORT,
+                        help=f"The port to listen on, {DEFAULT_PORT} by default.")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f"The interface to listen on, {DEFAULT_HOST} by default. "
+                             "Anyone who can reach the server can run code on this machine.")
+    args = parser.parse_args()
+    web.run_app(make_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Contains a small SQLite store for the pages
+of paged Embeds, so that they keep working
+after the Bot was restarted or reloaded.
+
+The pages are stored as serialized Embed
+dicts, keyed by the ID of the message the
+paged Embed was sent as, along with the time
+at which the paged Embed expires. Expired
+entries are removed when new ones are added.
+"""
+
+import json
+import sqlite3
+import time
+from typing import List, Optional, Set, Tuple
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS paged_embeds (
+    message_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    pages TEXT NOT NULL,
+    expires REAL NOT NULL
+)
+'''
+
+
+class EmbedStore:
+    """
+    Stores the pages of paged Embeds in the
+    SQLite database at `path`. A page is a
+    tuple of the emoji that shows it and the
+    dict of its Embed.
+
+    Example:
+
+        store = EmbedStore('paged_embeds.db')
+        store.save(msg.id, msg.channel.id, [("🍏", embed.to_dict())], expires)
+        channel_id, pages, expires = store.load(msg.id)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Used from one thread at a time, but not necessarily the one that opened it
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+    def save(self, message_id: int, channel_id: int,
+             pages: List[Tuple[str, dict]], expires: float):
+        """
+        Stores the pages of the paged Embed sent
+        as the given message until `expires`, a
+        UNIX timestamp, and removes expired entries.
+        """
+
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO paged_embeds VALUES (?, ?, ?, ?)',
+                (message_id, channel_id, json.dumps(pages), expires)
+            )
+            self._db.execute('DELETE FROM paged_embeds WHERE expires <= ?', (time.time(),))
+
+    def load(self, message_id: int) -> Optional[Tuple[int, List[Tuple[str, dict]], float]]:
+        """
+        Returns the channel ID, the pages and
+        the expiry time of the paged Embed sent
+        as the given message, or None if there
+        is none or it expired.
+        """
+
+        row = self._db.execute(
+            'SELECT channel_id, pages, expires FROM paged_embeds '
+            'WHERE message_id = ? AND expires > ?',
+            (message_id, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        channel_id, pages, expires = row
+        return channel_id, [tuple(page) for page in json.loads(pages)], expires
+
+    def message_ids(self) -> Set[int]:
+        """Returns the IDs of all messages with paged Embeds that did not expire."""
+
+        rows = self._db.execute(
+            'SELECT message_id FROM paged_embeds WHERE expires > ?', (time.time(),)
+        )
+        return {message_id for message_id, in rows}
+
+    def delete(self, message_id: int):
+        """Removes the paged Embed sent as the given message."""
+
+        with self._db:
+            self._db.execute('DELETE FROM paged_embeds WHERE message_id = ?', (message_id,))
+
+    def close(self):
+        """Closes the database."""
+
+        self._db.close()
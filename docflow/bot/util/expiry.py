@@ -0,0 +1,132 @@
+"""
+Contains a scheduler which calls functions
+once a given delay has passed.
+
+All pending calls are kept in a single heap
+ordered by their deadline, and only one timer
+is registered with the event loop at a time,
+for the call that is due next. This is used
+for expiring paged Embeds, of which there can
+be many at the same time, without starting a
+thread or a task for each of them.
+"""
+
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Optional
+
+
+class Expiry:  # pylint: disable=too-few-public-methods
+    """A scheduled call, as returned by ExpiryScheduler.schedule."""
+
+    __slots__ = ('deadline', 'seq', 'callback', 'cancelled')
+
+    def __init__(self, deadline: float, seq: int, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other: 'Expiry') -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class ExpiryScheduler:
+    """
+    Calls functions on the event loop once
+    their delay has passed.
+
+    Scheduling a call takes O(log n) time.
+    Cancelling one takes O(1) time: the call is
+    only marked as cancelled and dropped once it
+    reaches the top of the heap, or when more than
+    half of the heap consists of cancelled calls.
+
+    Example:
+
+        expiry = scheduler.schedule(5 * 60, embed.detach_listener)
+        ...
+        scheduler.cancel(expiry)
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop
+        self._heap = []
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._timer = None
+        self._timer_deadline = None
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop on which the calls are made."""
+
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        return self._loop
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Expiry:
+        """
+        Schedules `callback` to be called after
+        `delay` seconds and returns a handle which
+        can be passed to `cancel`.
+        """
+
+        expiry = Expiry(self.loop.time() + delay, next(self._seq), callback)
+        heapq.heappush(self._heap, expiry)
+        self._arm()
+        return expiry
+
+    def cancel(self, expiry: Expiry):
+        """Cancels a scheduled call, unless it was already made or cancelled."""
+
+        if expiry.cancelled or expiry.callback is None:
+            return
+        expiry.cancelled = True
+        expiry.callback = None
+        self._cancelled += 1
+
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+            self._arm()
+
+    def _arm(self):
+        """Makes sure the loop timer fires at the earliest deadline."""
+
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+        if not self._heap:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = self._timer_deadline = None
+            return
+
+        deadline = self._heap[0].deadline
+        if self._timer is not None and self._timer_deadline <= deadline:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self.loop.call_at(deadline, self._expire)
+        self._timer_deadline = deadline
+
+    def _expire(self):
+        """Makes all calls that are due and re-arms the timer."""
+
+        self._timer = self._timer_deadline = None
+        now = self.loop.time()
+        while self._heap and self._heap[0].deadline <= now:
+            expiry = heapq.heappop(self._heap)
+            if expiry.cancelled:
+                self._cancelled -= 1
+                continue
+            self.loop.call_soon(expiry.callback)
+            expiry.callback = None
+        self._arm()
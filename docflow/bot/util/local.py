@@ -0,0 +1,514 @@
+"""
+Contains an evaluation backend which runs
+code in local processes instead of sending
+it to Coliru.
+
+Every evaluation runs in a fresh temporary
+directory, inside a shell whose CPU time,
+memory and file sizes are limited through
+resource limits, which the programs it starts
+inherit. The shells are started ahead of time
+and wait for their commands on stdin, so that
+an evaluation does not have to wait for a new
+process to be started.
+
+C and C++ programs, whose commands compile
+`main.cpp` into `a.out` and then run it, are
+compiled only once per source and command: the
+built binaries are kept in a build cache and
+reused when the same code is evaluated again.
+C++ code which starts by including common
+standard headers is additionally compiled with
+a precompiled header of exactly those headers,
+which is built in the background on first use
+and speeds up compiling snippets that changed.
+
+The code is compiled in a separate process
+before it runs, and only the bot copies binaries
+into and out of the build cache. Evaluated code
+runs as the same user though, so it could still
+write to the cache: binaries are only reused if
+their SHA-256 hash is unchanged, and precompiled
+headers only while their files were not written
+to since they were built.
+
+Note that resource limits are not a security
+boundary. If the bot evaluates untrusted code
+locally, run it as an unprivileged user inside
+a container or virtual machine.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import resource
+import shlex
+import shutil
+import signal
+import tempfile
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+from .backend import TIMEOUT_NOTICE, Backend, EvalError, Result
+from .output import DEFAULT_WINDOW, BoundedOutput
+
+# The suffix of commands which compile `main.cpp` into `a.out` and then run it
+RUN_SUFFIX = ' && ./a.out'
+
+# The subdirectory of the build cache with the files of the backend
+CACHE_SUBDIR = 'local-backend'
+
+# How many precompiled headers are built at most, one per flags and list of includes
+MAX_HEADERS = 16
+
+# An include of a standard header, with the name of the header
+INCLUDE_PATTERN = re.compile(r'#\s*include\s*<([\w.+/]+)>')
+
+# The standard headers which may be precompiled for C++ evaluations
+PCH_HEADERS = (
+    'algorithm', 'array', 'chrono', 'cmath', 'cstdio', 'cstdlib', 'functional',
+    'iostream', 'map', 'memory', 'numeric', 'set', 'sstream', 'string',
+    'string_view', 'tuple', 'unordered_map', 'unordered_set', 'utility', 'vector'
+)
+
+# The shell command which shows the compiler output and runs the binary it built
+CACHED_RUN = 'cat cc.log' + RUN_SUFFIX
+
+
+def fingerprint(*paths: str) -> tuple:
+    """
+    Returns the inode, size and modification and
+    change times of the given files. Writing to a
+    file always updates its change time, which
+    cannot be set back.
+    """
+
+    return tuple(
+        (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+        for stat in map(os.stat, paths)
+    )
+
+
+def store_binary(path: str, workdir: str) -> Tuple[str, bytes]:
+    """
+    Copies the binary built in `workdir` to `path`
+    in the build cache. Returns its SHA-256 hash,
+    along with the compiler output.
+    """
+
+    with open(os.path.join(workdir, 'a.out'), 'rb') as binary_file:
+        binary = binary_file.read()
+    with open(os.path.join(workdir, 'cc.log'), 'rb') as log_file:
+        log = log_file.read()
+
+    descriptor, temporary = tempfile.mkstemp(prefix='tmp-', dir=os.path.dirname(path))
+    with os.fdopen(descriptor, 'wb') as cache_file:
+        cache_file.write(binary)
+    os.replace(temporary, path)
+    return hashlib.sha256(binary).hexdigest(), log
+
+
+def restore_binary(path: str, expected: str, log: bytes, workdir: str) -> bool:
+    """
+    Copies the cached binary at `path` into `workdir`
+    as `a.out`, along with the compiler output, if
+    its SHA-256 hash is still the `expected` one.
+    Returns whether it was copied.
+    """
+
+    try:
+        with open(path, 'rb') as cache_file:
+            binary = cache_file.read()
+    except FileNotFoundError:
+        return False
+    if hashlib.sha256(binary).hexdigest() != expected:
+        return False
+
+    with open(os.path.join(workdir, 'a.out'), 'wb') as binary_file:
+        binary_file.write(binary)
+    os.chmod(os.path.join(workdir, 'a.out'), 0o755)
+    with open(os.path.join(workdir, 'cc.log'), 'wb') as log_file:
+        log_file.write(log)
+    return True
+
+
+def remove_files(paths: List[str]):
+    """Removes the given files, if they exist."""
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def leading_includes(src: str) -> Tuple[str, ...]:
+    """
+    Returns the PCH_HEADERS which `src` includes
+    before anything else, in their order. Blank
+    lines and line comments are skipped, and the
+    first other line ends the includes.
+    """
+
+    includes = []
+    for line in src.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//') and not line.endswith('\\'):
+            continue
+        match = INCLUDE_PATTERN.fullmatch(line)
+        if match is None or match.group(1) not in PCH_HEADERS:
+            break
+        includes.append(match.group(1))
+    return tuple(includes)
+
+
+class Worker:  # pylint: disable=too-few-public-methods
+    """A shell waiting for a command, along with its working directory."""
+
+    def __init__(self, process, workdir: str):
+        self.process = process
+        self.workdir = workdir
+
+    def kill(self):
+        """Kills the shell and every process it started, and removes its directory."""
+
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class LocalBackend(Backend):  # pylint: disable=too-many-instance-attributes
+    """
+    Runs code in resource-limited local processes.
+
+    Arguments:
+        workers : int
+            How many idle shells are kept ready.
+        timeout : float
+            After how many seconds of wall-clock
+            time an evaluation is killed.
+        cpu_time : int
+            The CPU time limit of each process, in seconds.
+        memory : int
+            The address space limit of each process, in bytes.
+        max_output : int
+            After how many bytes of output an
+            evaluation is killed.
+        window : int
+            How many bytes are kept from the
+            start and the end of the output.
+        shell : str
+            The shell which runs the commands.
+        build_cache : str
+            The directory in which compiled binaries
+            and precompiled headers are kept, in its
+            subdirectory `local-backend`, which is
+            cleared when the backend is created. If not
+            given, a temporary directory is used,
+            which is removed when the backend is closed.
+        build_cache_size : int
+            How many compiled binaries are kept.
+            0 disables the build cache.
+        pch : bool
+            Whether C++ code is compiled with a
+            precompiled header.
+
+    Example:
+
+        backend = LocalBackend(workers=2, timeout=5)
+        await backend.start()
+        result = await backend.run('python3 main.cpp', 'print("Hello!")')
+        await backend.close()
+    """
+
+    name = 'local'
+
+    def __init__(self, workers: int = 2, timeout: float = 10.0,  # pylint: disable=too-many-arguments
+                 cpu_time: int = 5, memory: int = 512 * 1024 * 1024,
+                 max_output: int = 64 * 1024, window: int = DEFAULT_WINDOW,
+                 shell: str = '/bin/sh', build_cache: str = None,
+                 build_cache_size: int = 64, pch: bool = True):
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_time = cpu_time
+        self.memory = memory
+        self.max_output = max_output
+        self.window = window
+        self.shell = shell
+        self.build_cache = build_cache
+        self.build_cache_size = build_cache_size
+        self.pch = pch
+        self._temporary_cache = build_cache is None
+        if self._temporary_cache:
+            self.build_cache = tempfile.mkdtemp(prefix='docflow-build-')
+        # The files of earlier runs cannot be verified, so they are removed
+        self._cache_dir = os.path.join(self.build_cache, CACHE_SUBDIR)
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        os.makedirs(self._cache_dir)
+
+        # (Compiler flags, included headers) -> the path and fingerprint of the
+        # precompiled header, None while it is built or False if it failed or changed
+        self._headers = {}
+        # Artifact key -> SHA-256 of the cached binary and the compiler output,
+        # least recently used first
+        self._artifacts = OrderedDict()
+        self._pool = deque()
+        self._filling = False
+        self._closed = False
+
+    def _limit_resources(self):
+        """Sets the resource limits. Runs in the child process before the shell starts."""
+
+        resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_time, self.cpu_time))
+        resource.setrlimit(resource.RLIMIT_AS, (self.memory, self.memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (self.max_output * 16,) * 2)
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    async def _spawn(self) -> Worker:
+        """Starts a new shell in a new temporary directory."""
+
+        workdir = tempfile.mkdtemp(prefix='docflow-eval-')
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.shell, '-s',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=workdir,
+                preexec_fn=self._limit_resources,
+                start_new_session=True
+            )
+        except OSError as err:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise EvalError(f"Failed to start a local worker: {err}") from err
+        return Worker(process, workdir)
+
+    async def _fill_pool(self):
+        """Starts shells until `workers` idle shells are available."""
+
+        if self._filling:
+            return
+        self._filling = True
+        try:
+            while not self._closed and len(self._pool) < self.workers:
+                worker = await self._spawn()
+                if self._closed:
+                    worker.kill()
+                else:
+                    self._pool.append(worker)
+        finally:
+            self._filling = False
+
+    async def start(self):
+        await self._fill_pool()
+
+    def _artifact_key(self, compile_cmd: str, src: str) -> str:
+        """Returns the name under which the binary for the given source is cached."""
+
+        return hashlib.sha256(json.dumps([compile_cmd, src]).encode()).hexdigest()
+
+    async def _build_header(self, key: Tuple[str, Tuple[str, ...]], path: str):
+        """
+        Builds the precompiled header at `path` for
+        the given compiler flags and includes. The
+        header is only used once it was built
+        successfully. Failed builds are not retried.
+        """
+
+        flags, includes = key
+        try:
+            with open(path, 'w', encoding='utf-8') as header:
+                header.writelines(f'#include <{name}>\n' for name in includes)
+
+            # Not resource-limited like the workers, since precompiled headers are large
+            process = await asyncio.create_subprocess_shell(
+                f'g++ {flags} -x c++-header {shlex.quote(path)} -o {shlex.quote(path)}.gch.tmp '
+                f'&& mv {shlex.quote(path)}.gch.tmp {shlex.quote(path)}.gch',
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            if await process.wait() == 0:
+                self._headers[key] = (path, fingerprint(path, path + '.gch'))
+                return
+        except OSError:
+            pass
+        self._headers[key] = False
+
+    def _header_intact(self, key: Tuple[str, Tuple[str, ...]]) -> bool:
+        """
+        Returns whether the precompiled header for
+        the given flags and includes was built and
+        did not change since. Changed headers are
+        not used again.
+        """
+
+        header = self._headers.get(key)
+        if not header:
+            return False
+
+        path, expected = header
+        try:
+            intact = fingerprint(path, path + '.gch') == expected
+        except OSError:
+            intact = False
+        if not intact:
+            self._headers[key] = False
+        return intact
+
+    def _with_header(self, compile_cmd: str, src: str) -> Tuple[str, Optional[tuple]]:
+        """
+        Returns the given compile command with the
+        precompiled header of the standard headers
+        which `src` starts with included, if the
+        command uses g++ and the header was built,
+        along with the key of the header. Otherwise,
+        the header is built in the background and
+        the command is returned unchanged, without
+        a key. Since the header includes exactly
+        what the code includes first, it does not
+        change what the code means.
+        """
+
+        includes = leading_includes(src)
+        if not self.pch or 'g++ ' not in compile_cmd or not includes:
+            return compile_cmd, None
+
+        before, after = compile_cmd.split('g++ ', 1)
+        flags = ' '.join(arg for arg in shlex.split(after.split('&&')[0]) if arg.startswith('-'))
+        key = (flags, includes)
+        if key not in self._headers:
+            if len(self._headers) >= MAX_HEADERS:
+                return compile_cmd, None
+            self._headers[key] = None
+            name = hashlib.sha256(json.dumps(key).encode()).hexdigest()[:16]
+            path = os.path.join(self._cache_dir, f'pch-{name}.h')
+            asyncio.ensure_future(self._build_header(key, path))
+
+        if not self._header_intact(key):
+            return compile_cmd, None
+        header = self._headers[key][0]
+        return f'{before}g++ -include {shlex.quote(header)} {after}', key
+
+    async def _compile(self, worker: Worker, compile_cmd: str) -> int:
+        """
+        Runs `compile_cmd` in the directory of the
+        worker, with the same resource limits, and
+        returns its exit status. The compiler output
+        is written to `cc.log`.
+        """
+
+        process = await asyncio.create_subprocess_exec(
+            self.shell, '-c', f'{{ {compile_cmd}; }} > cc.log 2>&1',
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=worker.workdir,
+            preexec_fn=self._limit_resources,
+            start_new_session=True
+        )
+        try:
+            return await process.wait()
+        finally:
+            if process.returncode is None:
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    async def _build(self, worker: Worker, compile_cmd: str, src: str) -> str:
+        """
+        Puts the binary for `src` into the directory
+        of the worker, either copied from the build
+        cache or compiled by `compile_cmd`, which is
+        then added to the cache. This happens before
+        any of the code runs, so that the evaluated
+        programs never touch the cached binaries.
+        Returns the shell command which shows the
+        compiler output and runs the binary.
+        """
+
+        loop = asyncio.get_event_loop()
+        key = self._artifact_key(compile_cmd, src)
+        path = os.path.join(self._cache_dir, key)
+        cached = self._artifacts.get(key)
+        if cached is not None:
+            if await loop.run_in_executor(None, restore_binary, path, *cached, worker.workdir):
+                if key in self._artifacts:
+                    self._artifacts.move_to_end(key)
+                return CACHED_RUN
+            self._artifacts.pop(key, None)
+
+        compile_cmd, header = self._with_header(compile_cmd, src)
+        if await self._compile(worker, compile_cmd) != 0:
+            return 'cat cc.log'
+        if header is not None and not self._header_intact(header):
+            # The header changed while it was used, so the binary is not cached
+            return CACHED_RUN
+
+        self._artifacts[key] = await loop.run_in_executor(
+            None, store_binary, path, worker.workdir
+        )
+        self._artifacts.move_to_end(key)
+        stale = []
+        while len(self._artifacts) > self.build_cache_size:
+            stale.append(os.path.join(self._cache_dir, self._artifacts.popitem(last=False)[0]))
+        if stale:
+            await loop.run_in_executor(None, remove_files, stale)
+        return CACHED_RUN
+
+    @staticmethod
+    async def _read_output(worker: Worker, output: BoundedOutput):
+        """Reads the output of a worker into `output` until it ends or is full."""
+
+        while True:
+            chunk = await worker.process.stdout.read(4096)
+            if not chunk or not output.feed(chunk):
+                break
+
+    async def _evaluate(self, worker: Worker, cmd: str, src: str, output: BoundedOutput):
+        """
+        Passes the code to a worker and reads its
+        output into `output`. If `cmd` compiles the
+        code and the build cache is enabled, the
+        binary is built before the worker starts.
+        """
+
+        with open(os.path.join(worker.workdir, 'main.cpp'), 'w', encoding='utf-8') as src_file:
+            src_file.write(src)
+        if self.build_cache_size and cmd.endswith(RUN_SUFFIX):
+            cmd = await self._build(worker, cmd[:-len(RUN_SUFFIX)], src)
+        worker.process.stdin.write(cmd.encode() + b'\n')
+        worker.process.stdin.close()
+        await self._read_output(worker, output)
+
+    async def run(self, cmd: str, src: str) -> Result:
+        worker = self._pool.popleft() if self._pool else await self._spawn()
+        asyncio.ensure_future(self._fill_pool())
+
+        output = BoundedOutput(self.max_output, self.window)
+        timed_out = False
+        try:
+            await asyncio.wait_for(self._evaluate(worker, cmd, src, output), self.timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+        except OSError as err:
+            raise EvalError(f"Failed to pass the code to a local worker: {err}") from err
+        finally:
+            worker.kill()
+            await worker.process.wait()
+        if timed_out:
+            return Result(output.text() + TIMEOUT_NOTICE.format(self.timeout), True)
+        return Result(output.text())
+
+    async def close(self):
+        self._closed = True
+        while self._pool:
+            worker = self._pool.popleft()
+            worker.kill()
+            await worker.process.wait()
+        if self._temporary_cache:
+            shutil.rmtree(self.build_cache, ignore_errors=True)
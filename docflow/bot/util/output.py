@@ -0,0 +1,114 @@
+"""
+Contains helpers for handling the output of
+evaluated code, which can be arbitrarily large.
+
+Backends feed the output into a BoundedOutput
+as it arrives. It stops accepting output after
+a hard byte cap and only keeps the first and
+the last bytes it received, so that the memory
+used per evaluation is bounded no matter how
+much the evaluated program prints.
+The result can then be split into pages that
+fit into an Embed with `paginate`.
+"""
+
+from typing import List
+
+# How many bytes are kept from the start and from the end of the output
+DEFAULT_WINDOW = 4096
+
+
+class BoundedOutput:
+    """
+    Collects output while keeping only a head
+    and a tail window of `window` bytes each.
+
+    Arguments:
+        max_bytes : int
+            After how many bytes in total the
+            output is cut off. `feed` returns
+            False once this was reached.
+        window : int
+            How many bytes are kept from the
+            start and from the end of the output.
+
+    Example:
+
+        output = BoundedOutput(max_bytes=1024 * 1024)
+        async for chunk in res.content.iter_chunked(4096):
+            if not output.feed(chunk):
+                break
+        text = output.text()
+    """
+
+    def __init__(self, max_bytes: int, window: int = DEFAULT_WINDOW):
+        self.max_bytes = max_bytes
+        self.window = window
+        self.total = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    @property
+    def full(self) -> bool:
+        """Whether the byte cap was reached."""
+
+        return self.total >= self.max_bytes
+
+    @property
+    def omitted(self) -> int:
+        """How many bytes between the head and the tail were dropped."""
+
+        return self.total - len(self._head) - len(self._tail)
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Adds a chunk of output, ignoring everything
+        past the byte cap. Returns whether more
+        output is accepted.
+        """
+
+        chunk = chunk[:max(self.max_bytes - self.total, 0)]
+        self.total += len(chunk)
+
+        missing = self.window - len(self._head)
+        if missing > 0:
+            self._head += chunk[:missing]
+            chunk = chunk[missing:]
+
+        self._tail += chunk[-self.window:]
+        del self._tail[:-self.window]
+        return not self.full
+
+    def text(self) -> str:
+        """
+        Returns the kept output as text, with a note
+        on how many bytes were omitted in between,
+        and whether the output was cut off.
+        """
+
+        text = self._head.decode(errors='replace')
+        if self.omitted:
+            text += f'\n[... {self.omitted} bytes omitted ...]\n'
+        text += self._tail.decode(errors='replace')
+        if self.full:
+            text += f'\n[Output exceeded {self.max_bytes} bytes, stopped]'
+        return text
+
+
+def paginate(text: str, size: int) -> List[str]:
+    """
+    Splits the given text into pages of at most
+    `size` characters, breaking at newlines
+    where possible. Always returns at least one page.
+    """
+
+    pages = []
+    while len(text) > size:
+        end = text.rfind('\n', 0, size)
+        if end <= 0:
+            end = size
+        pages.append(text[:end])
+        text = text[end:].lstrip('\n')
+    if text or not pages:
+        pages.append(text)
+    return pages
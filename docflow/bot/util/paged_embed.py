@@ -1,5 +1,5 @@
 """
-This module defines two classes
+This module defines the classes
 for creating so-called paged Embeds.
 
 Paged Embeds are a special type of
@@ -17,20 +17,222 @@ changed through the variable
     EMBED_EXPIRY
 , which sets the interval for
 an embed to "expire", in minutes.
-This is achieved through using
-    threading.Timer
-, which is started when
-the message is sent.
+This is achieved through a single
+    expiry.ExpiryScheduler
+shared by all paged Embeds, with
+which each Embed is registered
+when its message is sent.
+
+Reactions are routed to the paged Embeds
+by a single ReactionDispatcher per bot,
+which looks up the Embed for the message
+that was reacted to by its ID. It listens
+to raw reaction events, so reactions are
+also handled on messages that dropped out
+of the bot's message cache.
+
+If `paged_embed_store` is set in the bot's
+configuration, the pages of paged Embeds are
+also stored in an EmbedStore at that path,
+whose queries run in a thread of their own.
+A paged Embed that is not known because the
+bot was restarted since it was sent is then
+restored from the store on the first reaction
+to its message. For this, the dispatcher is
+created along with the bot.
+
+The reactions for navigating a paged Embed
+are added concurrently, spaced out per channel
+by a RateLimiter, so that their round trips
+overlap instead of being made one at a time.
+How long it takes until a paged Embed is sent
+with all of its reactions, its time to
+interactive, is recorded by the dispatcher.
 """
 
-from threading import Timer
+import asyncio
+import inspect
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
 import discord
 from discord.ext import commands
 
+from .cache import LRUCache
+from .embed_store import EmbedStore
+from .expiry import ExpiryScheduler
+from .ratelimit import RateLimiter
+
 # After how many minutes the PagedEmbed should ignore reactions
 EMBED_EXPIRY = 5.0
 
+# Detaches the listeners of all paged Embeds once they expired
+EXPIRY_SCHEDULER = ExpiryScheduler()
+
+# The minimum interval between reactions added in one channel, in seconds
+REACTION_INTERVAL = 0.25
+
+# For how many recently sent paged Embeds the time to interactive is kept
+TIMING_SAMPLES = 100
+
+
+class ReactionDispatcher:
+    """
+    Routes raw reaction events to the paged
+    Embed that was sent as the message which
+    was reacted to. Use `for_bot` to get the
+    dispatcher of a bot instead of creating one.
+    """
+
+    # Bot -> its ReactionDispatcher
+    _dispatchers = weakref.WeakKeyDictionary()
+
+    def __init__(self, bot: commands.Bot):
+        self._bot = bot
+
+        # Message ID -> PagedEmbed
+        self._embeds = {}
+
+        store_path = bot.config.get('paged_embed_store')
+        self.store = EmbedStore(store_path) if store_path is not None else None
+        # Runs the queries of the store one at a time, off the event loop
+        self._store_executor = ThreadPoolExecutor(max_workers=1)
+
+        # IDs of the messages with stored paged Embeds, loaded on the first reaction
+        self._stored = None
+
+        # Channel ID -> RateLimiter for adding reactions
+        self._limiters = LRUCache(256)
+
+        # Times to interactive of recently sent paged Embeds, in seconds
+        self.interactive_times = deque(maxlen=TIMING_SAMPLES)
+
+        bot.add_listener(self.on_raw_reaction_add)
+        bot.add_listener(self.on_raw_message_delete)
+
+    def __len__(self):
+        return len(self._embeds)
+
+    @classmethod
+    def for_bot(cls, bot: commands.Bot) -> 'ReactionDispatcher':
+        """Returns the dispatcher of the given bot, creating it on first use."""
+
+        dispatcher = cls._dispatchers.get(bot)
+        if dispatcher is None:
+            dispatcher = cls._dispatchers[bot] = cls(bot)
+        return dispatcher
+
+    def _run_store(self, method, *args) -> asyncio.Future:
+        """Runs a method of the store in the executor of the store."""
+
+        return self._bot.loop.run_in_executor(self._store_executor, method, *args)
+
+    def limiter(self, channel_id: int) -> RateLimiter:
+        """Returns the rate limiter for adding reactions in the given channel."""
+
+        limiter = self._limiters.get(channel_id)
+        if limiter is None:
+            limiter = self._limiters[channel_id] = RateLimiter(REACTION_INTERVAL)
+        return limiter
+
+    def time_to_interactive(self) -> str:
+        """Returns a summary of the recorded times to interactive."""
+
+        if not self.interactive_times:
+            return 'No paged replies sent yet'
+        times = sorted(self.interactive_times)
+        return (f'**Average**: {sum(times) / len(times):.2f}s\n'
+                f'**Median**: {times[len(times) // 2]:.2f}s\n'
+                f'**Samples**: {len(times)}')
+
+    def register(self, message_id: int, embed: 'PagedEmbed', expires: float = None):
+        """
+        Routes reactions to the message with the
+        given ID to `embed`. If `expires` is given,
+        the pages of the paged Embed are stored
+        until then, if there is a store.
+        """
+
+        self._embeds[message_id] = embed
+        if expires is not None and self.store is not None:
+            self._run_store(
+                self.store.save, message_id, embed.channel_id, embed.stored_pages(), expires
+            )
+            if self._stored is not None:
+                self._stored.add(message_id)
+
+    def unregister(self, message_id: int):
+        """Stops routing reactions to the message with the given ID."""
+
+        self._embeds.pop(message_id, None)
+        if self.store is not None:
+            self._run_store(self.store.delete, message_id)
+            if self._stored is not None:
+                self._stored.discard(message_id)
+
+    async def restore(self, message_id: int) -> Optional['PagedEmbed']:
+        """
+        Restores the paged Embed sent as the given
+        message from the store, if it is stored.
+        Returns the paged Embed, or None if there
+        is none or its message can not be found.
+        """
+
+        if self.store is None:
+            return None
+        if self._stored is None:
+            self._stored = await self._run_store(self.store.message_ids)
+        if message_id not in self._stored:
+            return None
+
+        stored = await self._run_store(self.store.load, message_id)
+        channel = self._bot.get_channel(stored[0]) if stored is not None else None
+        if channel is None:
+            self._stored.discard(message_id)
+            return None
+
+        try:
+            msg = await channel.get_message(message_id)
+        except discord.HTTPException:
+            self.unregister(message_id)
+            return None
+
+        # Another reaction may have restored it in the meantime
+        if message_id not in self._embeds:
+            PagedEmbed.restore(self._bot, msg, stored[1], stored[2])
+        return self._embeds.get(message_id)
+
+    async def on_raw_reaction_add(self, payload):
+        """
+        The event handler for the raw_reaction_add
+        event defined by discord.py, which passes
+        the reaction on to the paged Embed of the
+        message, if there is one.
+        """
+
+        if payload.user_id == self._bot.user.id:
+            return
+
+        embed = self._embeds.get(payload.message_id)
+        if embed is None:
+            embed = await self.restore(payload.message_id)
+        if embed is not None:
+            await embed.on_reaction(str(payload.emoji), payload.user_id)
+
+    async def on_raw_message_delete(self, payload):
+        """
+        The event handler for the raw_message_delete
+        event defined by discord.py, which expires
+        the paged Embed of the deleted message.
+        """
+
+        embed = self._embeds.get(payload.message_id)
+        if embed is not None:
+            embed.expire()
+
 
 class PagedEmbed:
     """
@@ -38,18 +240,20 @@ class PagedEmbed:
     a collection of discord.Embeds which
     are navigatable through reactions.
 
-    The PagedEmbed will attach an
-    event listener for the reaction
-    add event which it uses to edit
-    its content independently without
-    having to override the default
-    on_reaction_add method from the
+    Once sent, the PagedEmbed is
+    registered with the bot's
+    ReactionDispatcher, which passes
+    reactions to its message on to it
+    so that it can edit its content
+    independently without having to
+    override the default
+    on_raw_reaction_add method from the
     client. To avoid infinitely
-    cluttering up the handlers for the
-    reaction add event, sending the
-    PagedEmbed will start a
-    threading.Timer which automatically
-    deattaches the event handler from
+    cluttering up the dispatcher,
+    sending the PagedEmbed will also
+    register it with the
+    EXPIRY_SCHEDULER, which
+    automatically deattaches it from
     the bot after the interval set in
     the variable EMBED_EXPIRY, in minutes.
     This defaults to removing the handler
@@ -144,6 +348,7 @@ class PagedEmbed:
         self._ctx = ctx
         self._bot = bot
         self._msg = None
+        self._expiry = None
 
         # Dictionary to contain embed Pages in the following format:
         #   {
@@ -157,22 +362,20 @@ class PagedEmbed:
         }
         self.current_page = self._pages[idx_emoji]
 
-        # Attach our event listener to the bot
-        self._bot.add_listener(self.on_reaction_add)
-
     def detach_listener(self):
         """
-        Detaches the event listener for the
-        on_reaction_add event which the
-        PagedEmbed uses to edit itself on a
-        relevant reaction. Normally, you do
+        Detaches the PagedEmbed from the
+        ReactionDispatcher, which passes it
+        the reactions it uses to edit itself
+        on a relevant reaction. Normally, you do
         not have to call this function
         manually, it is called automatically
         after a delay (see documentation for
         this class itself.).
         """
 
-        self._bot.remove_listener(self.on_reaction_add)
+        if self._msg is not None:
+            ReactionDispatcher.for_bot(self._bot).unregister(self._msg.id)
 
     def add_page(self, emoji: str, page: discord.Embed):
         r"""
@@ -235,36 +438,32 @@ class PagedEmbed:
             raise ValueError("A handler or an discord.Embed for this Emoji was already added")
         self._pages[emoji] = handler
 
-    async def on_reaction_add(self, reaction, user):
+    async def on_reaction(self, emoji: str, user_id: int):
         """
-        The event handler for the reaction_add
-        event defined by discord.py. The
-        PagedEmbed uses this to change its pages
-        when appropriate. Additionally, when
-        a user reacts with a reaction that
-        causes this PagedEmbed to change its
-        contents, the bot will automatically
-        remove the reaction to easily allow
-        further navigation.
+        Called by the ReactionDispatcher when
+        a user reacted to the message of this
+        PagedEmbed. The PagedEmbed uses this
+        to change its pages when appropriate.
+        Additionally, when a user reacts with
+        a reaction that causes this PagedEmbed
+        to change its contents, the bot will
+        automatically remove the reaction to
+        easily allow further navigation.
         You probably do not want to use this directly.
         """
 
-        as_string = str(reaction)
-        print(as_string)
-
-
-        if user == self._bot.user or as_string not in self._pages:
+        handler = self._pages.get(emoji)
+        if handler is None:
             return
-        elif reaction.message.id == self._msg.id:
-            await self._msg.remove_reaction(reaction, user)
-            handler = self._pages[as_string]
-            print(handler)
 
-            if callable(handler):
-                print(self._msg)
-                await reaction()
-            elif isinstance(handler, discord.Embed):
-                await self._msg.edit(embed=self._pages[as_string])
+        await self._msg.remove_reaction(emoji, discord.Object(id=user_id))
+        if isinstance(handler, discord.Embed):
+            self.current_page = handler
+            await self._msg.edit(embed=handler)
+        else:
+            result = handler()
+            if inspect.isawaitable(result):
+                await result
 
     async def send(self):
         """
@@ -275,21 +474,89 @@ class PagedEmbed:
         the navigation choices.
         """
 
+        start = time.perf_counter()
+        dispatcher = ReactionDispatcher.for_bot(self._bot)
         self._msg = await self._ctx.send(embed=self.current_page)
+        dispatcher.register(self._msg.id, self, time.time() + EMBED_EXPIRY * 60)
+
+        # Detach from the dispatcher after the set interval
+        self._expiry = EXPIRY_SCHEDULER.schedule(EMBED_EXPIRY * 60, self.detach_listener)
 
-        for reaction in self._pages:
-            await self._msg.add_reaction(reaction)
+        limiter = dispatcher.limiter(self.channel_id)
+
+        async def add_reaction(emoji: str):
+            await limiter.wait()
+            await self._msg.add_reaction(emoji)
+
+        results = await asyncio.gather(
+            *(add_reaction(emoji) for emoji in self._pages), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        dispatcher.interactive_times.append(time.perf_counter() - start)
+
+    @classmethod
+    def restore(cls, bot: commands.Bot, msg: discord.Message,
+                pages: List[Tuple[str, dict]], expires: float) -> 'PagedEmbed':
+        """
+        Recreates a paged Embed that was already
+        sent as `msg` from its stored pages, and
+        registers it with the ReactionDispatcher
+        until `expires`, a UNIX timestamp.
+        """
+
+        (idx_emoji, idx_page), *other_pages = pages
+        embed = cls(None, bot, idx_emoji, discord.Embed.from_dict(idx_page))
+        for emoji, page in other_pages:
+            embed.add_page(emoji, discord.Embed.from_dict(page))
+
+        embed._msg = msg  # pylint: disable=protected-access
+        ReactionDispatcher.for_bot(bot).register(msg.id, embed)
+        embed._expiry = EXPIRY_SCHEDULER.schedule(  # pylint: disable=protected-access
+            max(expires - time.time(), 0), embed.detach_listener
+        )
+        return embed
+
+    @property
+    def channel_id(self) -> int:
+        """The ID of the channel the PagedEmbed was sent to."""
+
+        return self._msg.channel.id
+
+    def stored_pages(self) -> List[Tuple[str, dict]]:
+        """
+        Returns the pages of the PagedEmbed as
+        they are stored, as tuples of emoji and
+        Embed dict. Pages which are handled
+        by a function instead can not be stored.
+        """
+
+        return [
+            (emoji, page.to_dict()) for emoji, page in self._pages.items()
+            if isinstance(page, discord.Embed)
+        ]
+
+    def expire(self):
+        """
+        Stops responding to reactions right
+        away, instead of after the set interval.
+        """
 
-        # Start a timer to detach the event listener after the set interval
-        Timer(EMBED_EXPIRY * 60, self.detach_listener).start()
+        if self._expiry is not None:
+            EXPIRY_SCHEDULER.cancel(self._expiry)
+            self._expiry = None
+        self.detach_listener()
 
     async def delete(self):
         """
         A shortcut to delete the underlying
         message of the PagedEmbed. By
         default, it is never deleted, only
-        the "reaction add" event handler is
-        detached after a set interval.
+        detached from the ReactionDispatcher
+        after a set interval. Deleting it
+        detaches it right away.
         """
 
+        self.expire()
         await self._msg.delete()
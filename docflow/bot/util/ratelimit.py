@@ -0,0 +1,44 @@
+"""
+Contains a rate limiter which spaces out
+requests to Discord, so that several requests
+can be started at once without running into
+Discord's rate limits.
+"""
+
+import asyncio
+
+
+class RateLimiter:  # pylint: disable=too-few-public-methods
+    """
+    Allows one request every `interval` seconds.
+
+    Every call to `wait` reserves the next free
+    slot and sleeps until it is reached. Slots
+    are reserved in the order in which `wait`
+    is called, so requests started concurrently
+    are sent in the order they were started,
+    while their round trips overlap.
+
+    Example:
+
+        limiter = RateLimiter(0.25)
+
+        async def add(emoji):
+            await limiter.wait()
+            await msg.add_reaction(emoji)
+
+        await asyncio.gather(*(add(emoji) for emoji in emojis))
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        """Waits until the next free slot, which is reserved for the caller."""
+
+        now = asyncio.get_event_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
@@ -0,0 +1,120 @@
+"""
+Contains a scheduler which limits how many
+evaluations run at the same time and queues
+the rest, so that bursts of `.eval` commands
+do not all hit the evaluation service at once.
+
+Queued jobs are kept in one FIFO queue per
+guild, and the queues are served round-robin,
+so that a single busy guild can not starve
+all other guilds.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Hashable, Tuple
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+
+class EvalScheduler:  # pylint: disable=too-few-public-methods
+    """
+    Runs at most `concurrency` jobs at the same
+    time and queues up to `max_queued` more.
+
+    A job is a function returning an awaitable,
+    which is only called once the job starts.
+    Submitting a job returns a future for its
+    result along with its position in the queue,
+    with 0 meaning that the job started right away.
+
+    Example:
+
+        scheduler = EvalScheduler(concurrency=2, max_queued=10)
+        future, position = scheduler.submit(ctx.guild.id, lambda: evaluate(code))
+        result = await future
+    """
+
+    def __init__(self, concurrency: int = 4, max_queued: int = 20):
+        if concurrency < 1:
+            raise ValueError("The concurrency of a scheduler must be at least 1")
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.running = 0
+        self.queued = 0
+
+        # Guild ID -> deque of (job, future), ordered by which guild is served next
+        self._queues = OrderedDict()
+
+    def submit(self, key: Hashable,
+               job: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Future, int]:
+        """
+        Submits a job for the guild (or other key)
+        `key` and returns a future for its result
+        and its 1-based position in the queue, or 0
+        if it was started immediately.
+        Raises QueueFull if the queue is full.
+        """
+
+        future = asyncio.get_event_loop().create_future()
+        if self.running < self.concurrency and not self.queued:
+            self._start(job, future)
+            return future, 0
+        if self.queued >= self.max_queued:
+            raise QueueFull(f"There are already {self.queued} jobs queued")
+
+        queue = self._queues.setdefault(key, deque())
+        queue.append((job, future))
+        self.queued += 1
+        return future, self._position(key, len(queue) - 1)
+
+    def _position(self, key: Hashable, idx: int) -> int:
+        """
+        Returns the 1-based position of the job at
+        `idx` in the queue of `key`, taking into account
+        that the queues are served in round-robin order.
+        """
+
+        position = idx + 1
+        before = True
+        for other_key, queue in self._queues.items():
+            if other_key == key:
+                before = False
+            else:
+                position += min(len(queue), idx + 1 if before else idx)
+        return position
+
+    def _start(self, job: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        """Runs the given job and resolves its future once it is done."""
+
+        async def run():
+            try:
+                result = await job()
+            except Exception as err:  # pylint: disable=broad-except
+                if not future.done():
+                    future.set_exception(err)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.running -= 1
+                self._start_next()
+
+        self.running += 1
+        asyncio.ensure_future(run())
+
+    def _start_next(self):
+        """Starts queued jobs, serving the guilds round-robin."""
+
+        while self.running < self.concurrency and self._queues:
+            key, queue = self._queues.popitem(last=False)
+            job, future = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues[key] = queue
+
+            # The command waiting for this job may have been cancelled
+            if not future.done():
+                self._start(job, future)
@@ -0,0 +1,197 @@
+"""
+Contains a compact binary format for
+reference data, so that the bot does not
+have to keep every scraped record in memory.
+
+A store file consists of a header, followed
+by the records as separately compressed JSON
+blobs and an index section at the end:
+
+    header:  magic, record count, offset of the index
+    records: zlib-compressed JSON, one blob per record
+    index:   the start offset of every blob (plus the
+             end of the last one), followed by the
+             names of every record as compressed JSON
+
+Opening a store only reads the index section.
+The record blobs are memory-mapped and only
+decoded when a record is accessed.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Iterable, List, Sequence
+
+MAGIC = b"DFREF001"
+HEADER = struct.Struct("<8sIQ")
+
+
+def record_names(record: dict) -> List[str]:
+    """
+    Returns the names of a record, which are
+    stored in the index section of a store.
+    Symbols have a list of `names`, while
+    stubs only have a single `name`.
+    """
+
+    if 'names' in record:
+        return record['names']
+    return [record['name']]
+
+
+class StoreWriter:
+    """
+    Writes records into a new store at `path`
+    one at a time, so that records can be stored
+    as they are produced, for example while they
+    are being scraped. The store is written to a
+    temporary file, which replaces the old store
+    once `close` is called, so that stores which
+    are currently opened are not affected.
+
+    Example:
+
+        with StoreWriter("data/cpp_symbols.ref") as writer:
+            for record in records:
+                writer.add(record)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.names = []
+        self._offsets = array('Q')
+        self._tmp_path = path + ".tmp"
+        self._out = open(self._tmp_path, 'wb')  # pylint: disable=consider-using-with
+        self._out.write(HEADER.pack(MAGIC, 0, 0))
+
+    def __enter__(self) -> 'StoreWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, record: dict):
+        """Appends a record to the store."""
+
+        self._offsets.append(self._out.tell())
+        self.names.append(record_names(record))
+        self._out.write(zlib.compress(json.dumps(record, separators=(',', ':')).encode()))
+
+    def close(self):
+        """Writes the index section and replaces the old store with the new one."""
+
+        self._offsets.append(self._out.tell())
+        index_offset = self._out.tell()
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+        self._out.write(self._offsets.tobytes())
+        self._out.write(zlib.compress(json.dumps(self.names, separators=(',', ':')).encode()))
+
+        self._out.seek(0)
+        self._out.write(HEADER.pack(MAGIC, len(self.names), index_offset))
+        self._out.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discards the new store, keeping the old one."""
+
+        self._out.close()
+        os.remove(self._tmp_path)
+
+
+def build_store(records: Iterable[dict], path: str):
+    """
+    Writes the given records into a new store
+    at `path`. The store is written to a
+    temporary file first, which then replaces
+    the old store, so that stores which are
+    currently opened are not affected.
+    """
+
+    with StoreWriter(path) as writer:
+        for record in records:
+            writer.add(record)
+
+
+class ReferenceStore(Sequence):
+    """
+    A read-only sequence of the records
+    in a store file written by `build_store`.
+
+    The names of all records are available
+    through `names` without decoding any
+    record. Accessing a record by its index
+    decompresses and parses only that record.
+
+    Example:
+
+        symbols = ReferenceStore("data/cpp_symbols.ref")
+        symbols.names[0]  # ["std::abs"]
+        symbols[0]        # the full record for std::abs
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as store_file:
+            if os.fstat(store_file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is not a reference store")
+            self._map = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read_index()
+        except (struct.error, zlib.error) as err:
+            self._map.close()
+            raise ValueError("corrupt reference store") from err
+        except ValueError:
+            self._map.close()
+            raise
+
+    def _read_index(self):
+        """
+        Reads the offsets and the names of
+        the records from the index section.
+        """
+
+        magic, count, index_offset = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a reference store")
+
+        names_offset = index_offset + (count + 1) * 8
+        if names_offset > len(self._map):
+            raise ValueError("corrupt reference store")
+        self._offsets = array('Q')
+        self._offsets.frombytes(self._map[index_offset:names_offset])
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+        self.names = json.loads(zlib.decompress(self._map[names_offset:]))
+        if len(self.names) != count:
+            raise ValueError("corrupt reference store")
+
+    def __getitem__(self, idx: int) -> dict:
+        if not -len(self) <= idx < len(self):
+            raise IndexError("reference store index out of range")
+        idx %= len(self)
+        blob = self._map[self._offsets[idx]:self._offsets[idx + 1]]
+        try:
+            return json.loads(zlib.decompress(blob))
+        except zlib.error as err:
+            raise ValueError("corrupt reference store") from err
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def close(self):
+        """Closes the memory map of the store file."""
+
+        self._map.close()
@@ -0,0 +1,284 @@
+"""
+Contains the crawl frontier of the spiders:
+URL canonicalization, a seen-set shared by all
+spiders of a scrape run and a map of known
+redirects, along with the spider middleware
+which applies them to every followed link.
+
+Links are canonicalized before they are
+requested: fragments are stripped, query
+arguments sorted, and wiki paths under `/w/`
+normalized the way MediaWiki resolves them, so
+that anchors and spelling variants of a page
+are only requested once. Links to pages which
+redirected before during the run are sent to
+the redirect target right away.
+
+The seen-set and the redirects are kept in the
+SQLite database set by FRONTIER_DB, which
+defaults to `.scrapy/frontier.sqlite`. Pages
+are seen per callback, so spiders which parse
+a page for different data still get it. Both
+are cleared whenever a new run starts, as
+identified by FRONTIER_RUN, so that pages which
+stopped redirecting are requested again. The
+redirects of the last run are kept for the
+offline reparse.
+"""
+
+import re
+import sqlite3
+import uuid
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import data_path
+from w3lib.url import canonicalize_url
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS seen (
+    run TEXT NOT NULL,
+    callback TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (callback, url)
+);
+CREATE TABLE IF NOT EXISTS redirects (
+    run TEXT NOT NULL,
+    url TEXT PRIMARY KEY,
+    target TEXT NOT NULL
+);
+'''
+
+# MediaWiki entry points which show a page given as `title` argument
+WIKI_SCRIPTS = ('/mwiki/index.php', '/w/index.php')
+
+# How many pages are marked as seen before they are committed
+COMMIT_INTERVAL = 500
+
+
+def canonical_url(url: str) -> str:
+    """
+    Returns the canonical form of `url`, without
+    a fragment, duplicate slashes in its path and
+    with sorted query arguments. Wiki pages are
+    always linked as `/w/<title>` with underscores
+    instead of spaces, for example both
+        http://en.cppreference.com/mwiki/index.php?title=cpp/container/vector#Member_types
+        http://en.cppreference.com//w/cpp/container/vector
+    become
+        http://en.cppreference.com/w/cpp/container/vector
+    """
+
+    scheme, netloc, path, query, _ = urlsplit(url)
+    path = re.sub('/{2,}', '/', path)
+    args = parse_qs(query)
+    if path in WIKI_SCRIPTS and list(args) == ['title']:
+        path, query = re.sub('/{2,}', '/', '/w/' + args['title'][0]), ''
+    if path.startswith('/w/'):
+        path = path.replace(' ', '_').replace('%20', '_')
+    return canonicalize_url(urlunsplit((scheme.lower(), netloc.lower(), path, query, '')))
+
+
+def load_redirects(path: str) -> Dict[str, str]:
+    """Returns the known redirects in the frontier database at `path`, if it exists."""
+
+    try:
+        database = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    except sqlite3.OperationalError:
+        return {}
+    try:
+        return dict(database.execute('SELECT url, target FROM redirects'))
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        database.close()
+
+
+class FrontierStore:
+    """
+    Keeps the seen-set of a scrape run and the
+    redirects it found in the SQLite database at
+    `path`. The crawlers of a process share one
+    store per database, so use `open` instead of
+    creating a store directly.
+    """
+
+    # Path -> the store which is open for it
+    _stores = {}
+
+    def __init__(self, path: str, run: str):
+        self.path = path
+        self.run = run
+        self._users = 0
+        self._pending = 0
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+        with self._db:
+            self._db.execute('DELETE FROM seen WHERE run != ?', (run,))
+            self._db.execute('DELETE FROM redirects WHERE run != ?', (run,))
+        self.redirects = dict(self._db.execute('SELECT url, target FROM redirects'))
+
+    @classmethod
+    def open(cls, path: str, run: str) -> 'FrontierStore':
+        """Returns the store for `path`, opening it unless another crawler uses it already."""
+
+        store = cls._stores.get(path)
+        if store is None:
+            store = cls._stores[path] = cls(path, run)
+        store._users += 1  # pylint: disable=protected-access
+        return store
+
+    def mark_seen(self, callback: str, url: str) -> bool:
+        """
+        Marks the canonical `url` as seen for the
+        given callback. Returns False if it was
+        seen before during this run.
+        """
+
+        cursor = self._db.execute(
+            'INSERT OR IGNORE INTO seen VALUES (?, ?, ?)', (self.run, callback, url)
+        )
+        if cursor.rowcount == 0:
+            return False
+
+        self._pending += 1
+        if self._pending >= COMMIT_INTERVAL:
+            self._db.commit()
+            self._pending = 0
+        return True
+
+    def add_redirect(self, url: str, target: str) -> bool:
+        """
+        Remembers that the canonical `url` redirects
+        to `target`. Returns whether this is new.
+        """
+
+        if url == target or self.redirects.get(url) == target:
+            return False
+        self.redirects[url] = target
+        self.redirects.pop(target, None)
+        self._db.execute(
+            'INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)', (self.run, url, target)
+        )
+        self._db.execute('DELETE FROM redirects WHERE url = ?', (target,))
+        return True
+
+    def close(self):
+        """Closes the database once no crawler uses the store anymore."""
+
+        self._users -= 1
+        if self._users > 0:
+            return
+        self._db.commit()
+        self._db.close()
+        del self._stores[self.path]
+
+
+class FrontierMiddleware:
+    """
+    Canonicalizes the links the spiders follow,
+    sends them to known redirect targets and
+    drops links to pages which were seen before
+    during this run. Redirects are learned from
+    the responses the spiders receive.
+    """
+
+    def __init__(self, crawler, store: FrontierStore):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the middleware, unless FRONTIER_ENABLED is not set."""
+
+        if not crawler.settings.getbool('FRONTIER_ENABLED'):
+            raise NotConfigured("FRONTIER_ENABLED is not set")
+
+        path = crawler.settings.get('FRONTIER_DB') or data_path('frontier.sqlite')
+        run = crawler.settings.get('FRONTIER_RUN') or uuid.uuid4().hex
+        middleware = cls(crawler, FrontierStore.open(path, run))
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(middleware.request_dropped, signal=signals.request_dropped)
+        return middleware
+
+    def spider_closed(self, spider):  # pylint: disable=unused-argument
+        """Releases the store."""
+
+        self.store.close()
+
+    def request_dropped(self, request, spider):  # pylint: disable=unused-argument
+        """
+        Learns the redirects that led to requests
+        which the scheduler dropped as duplicates,
+        such as redirects to pages seen before.
+        """
+
+        self.learn_redirects(request.meta.get('redirect_urls', ()), canonical_url(request.url))
+
+    def learn_redirects(self, sources, target: str):
+        """Remembers that the given URLs redirect to the canonical `target`."""
+
+        for source in sources:
+            if self.store.add_redirect(canonical_url(source), target):
+                self.stats.inc_value('frontier/redirects_learned')
+
+    def callback_name(self, request: scrapy.Request) -> str:
+        """Returns the qualified name of the callback which parses the response to `request`."""
+
+        if request.callback is None:
+            return type(self.crawler.spider).__qualname__ + '.parse'
+        return request.callback.__qualname__
+
+    def process_spider_input(self, response, spider=None):  # pylint: disable=unused-argument
+        """Learns the redirects that led to the response and marks its page as seen."""
+
+        url = canonical_url(response.url)
+        self.learn_redirects(response.meta.get('redirect_urls', ()), url)
+        if response.request is not None:
+            self.store.mark_seen(self.callback_name(response.request), url)
+
+    def process_spider_output(self, response, result, spider=None):  # pylint: disable=unused-argument
+        """Passes on items and the requests for pages that were not seen yet."""
+
+        for entry in result:
+            if isinstance(entry, scrapy.Request):
+                entry = self.process_request(entry)
+                if entry is None:
+                    continue
+            yield entry
+
+    async def process_spider_output_async(self, response, result, spider=None):  # pylint: disable=unused-argument
+        """Like `process_spider_output`, for callbacks which are asynchronous generators."""
+
+        async for entry in result:
+            if isinstance(entry, scrapy.Request):
+                entry = self.process_request(entry)
+                if entry is None:
+                    continue
+            yield entry
+
+    def process_request(self, request: scrapy.Request) -> Optional[scrapy.Request]:
+        """
+        Returns the request for the canonical URL
+        of `request`, or None if its page was seen
+        before. Requests with `dont_filter` set are
+        only canonicalized.
+        """
+
+        url = canonical_url(request.url)
+        target = self.store.redirects.get(url)
+        if target is not None:
+            url = target
+            self.stats.inc_value('frontier/redirects_followed')
+
+        if not request.dont_filter and not self.store.mark_seen(self.callback_name(request), url):
+            self.stats.inc_value('frontier/duplicates')
+            return None
+        if url != request.url:
+            self.stats.inc_value('frontier/canonicalized')
+            return request.replace(url=url)
+        return request
@@ -0,0 +1,194 @@
+"""
+Contains a downloader middleware for scraping
+incrementally, along with a function to merge
+the results of an incremental scrape into the
+previously scraped reference data.
+
+The middleware keeps the ETag, the Last-Modified
+date and a hash of the content of every page a
+spider parses, in a JSON file per spider. When
+the INCREMENTAL setting is enabled, requests for
+pages that were parsed before are sent as
+conditional requests, and pages which were
+either not modified or have the same content
+as before are dropped instead of being parsed
+again. Only requests with `incremental` set in
+their meta are handled like this, so that index
+pages which only link to other pages are always
+parsed.
+
+The state file also lists every page that was
+requested during the last crawl, whether or not
+the request succeeded, the pages which were
+parsed again because they changed, and the pages
+which are gone, answered with 404 or 410. These
+are used to drop the items of pages that are no
+longer linked, gone or changed when merging the
+results. Pages whose request failed otherwise
+keep their items.
+"""
+
+import hashlib
+import json
+import os
+from typing import Iterable, Iterator, Sequence
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from scrapy.utils.project import data_path
+
+
+def merge_items(old: Iterable[dict], new: Sequence[dict], requested: Iterable[str],
+                changed: Iterable[str] = (), gone: Iterable[str] = ()) -> Iterator[dict]:
+    """
+    Merges the items of an incremental scrape into
+    the previously scraped items, by their `link`.
+    Yields the new items, followed by the old items
+    which were not replaced by new items with the
+    same link. Old items are dropped as well if
+    their link was not requested during the
+    incremental scrape, their page is gone or it
+    changed, even if it yielded no new items.
+    Items of pages whose request failed are kept.
+    """
+
+    dropped = {item['link'] for item in new}.union(changed, gone)
+    requested = set(requested)
+    yield from new
+    for item in old:
+        if item['link'] in requested and item['link'] not in dropped:
+            yield item
+
+
+class IncrementalMiddleware:
+    """
+    Records the validators and content hashes
+    of parsed pages and, in incremental mode,
+    drops pages that did not change.
+    """
+
+    def __init__(self, crawler):
+        self.stats = crawler.stats
+        self.incremental = crawler.settings.getbool('INCREMENTAL')
+        self.state_path = crawler.settings.get('INCREMENTAL_STATE')
+        self.pages = {}
+        self.requested = set()
+        self.changed = set()
+        self.gone = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the middleware and connects it to the spider signals."""
+
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        """
+        Loads the state recorded by the last crawl
+        of the spider. If the state file is corrupt,
+        every page is parsed again.
+        """
+
+        if self.state_path is None:
+            self.state_path = data_path(os.path.join('incremental', spider.name + '.json'),
+                                        createdir=False)
+        if not os.path.exists(self.state_path):
+            return
+
+        try:
+            with open(self.state_path, encoding='utf-8') as state_file:
+                pages = json.load(state_file)['pages']
+            if not isinstance(pages, dict):
+                raise ValueError("'pages' is not an object")
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            spider.logger.warning("Ignoring the corrupt state file %s: %s", self.state_path, err)
+            return
+        self.pages = pages
+
+    def spider_closed(self, spider, reason):  # pylint: disable=unused-argument
+        """
+        Stores the state of the pages requested
+        during this crawl, if the crawl finished.
+        """
+
+        if reason != 'finished':
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        pages = {
+            url: page for url, page in self.pages.items()
+            if url in self.requested and url not in self.gone
+        }
+        with open(self.state_path + '.tmp', 'w', encoding='utf-8') as state_file:
+            json.dump({
+                'pages': pages,
+                'requested': sorted(self.requested),
+                'changed': sorted(self.changed),
+                'gone': sorted(self.gone)
+            }, state_file)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def process_request(self, request, spider=None):  # pylint: disable=unused-argument
+        """
+        Records the requested pages, and adds the
+        validators of the last crawl to requests
+        for known pages.
+        """
+
+        if not request.meta.get('incremental'):
+            return None
+
+        self.requested.add(request.url)
+        page = self.pages.get(request.url)
+        if not self.incremental or page is None:
+            return None
+
+        if page['etag'] is not None:
+            request.headers.setdefault('If-None-Match', page['etag'])
+        if page['last_modified'] is not None:
+            request.headers.setdefault('If-Modified-Since', page['last_modified'])
+        return None
+
+    def process_response(self, request, response, spider=None):  # pylint: disable=unused-argument
+        """
+        Records the validators and content hash of
+        parsed pages. In incremental mode, raises
+        IgnoreRequest for pages that did not change.
+        """
+
+        if not request.meta.get('incremental'):
+            return response
+        if response.status in (404, 410):
+            self.gone.add(request.url)
+            return response
+        if response.status not in (200, 304):
+            return response
+
+        if response.status == 304:
+            self.stats.inc_value('incremental/not_modified')
+            raise IgnoreRequest(f"Not modified: {request.url}")
+
+        content_hash = hashlib.sha256(response.body).hexdigest()
+        unchanged = self.pages.get(request.url, {}).get('hash') == content_hash
+        self.pages[request.url] = {
+            'etag': _header(response, 'ETag'),
+            'last_modified': _header(response, 'Last-Modified'),
+            'hash': content_hash
+        }
+        if self.incremental and unchanged:
+            self.stats.inc_value('incremental/unchanged')
+            raise IgnoreRequest(f"Unchanged: {request.url}")
+
+        self.changed.add(request.url)
+        self.stats.inc_value('incremental/changed')
+        return response
+
+
+def _header(response, name: str):
+    """Returns the value of the given response header as a string, or None."""
+
+    value = response.headers.get(name)
+    return value.decode('latin-1') if value is not None else None
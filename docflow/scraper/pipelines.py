@@ -1,12 +1,88 @@
-# -*- coding: utf-8 -*-
-# pylint: skip-file
+"""
+Contains the item pipeline which streams the
+scraped items into the bot's reference stores.
 
-# Define your item pipelines here
-#
-# Don't forget to add your pipeline to the ITEM_PIPELINES setting
-# See: http://doc.scrapy.org/en/latest/topics/item-pipeline.html
+Every item is written into the store of its
+spider as soon as it is scraped, so the items
+never have to be kept in memory or be written
+into one big JSON file that has to be parsed
+again afterwards. The names of the items, which
+make up the index section of the store, are
+collected along the way, and items whose names
+were all scraped before are dropped, as well as
+items without any name, which could never be
+looked up. The bot builds its search indexes
+from these names when it loads the store,
+without decoding any item.
 
+The pipeline is only enabled if the setting
+REFERENCE_OUTPUT_DIR is set, in which case the
+store is written to `<spider name>.ref` in that
+directory. It only replaces the old store if
+the spider finished and stored any items, so
+that an aborted crawl does not leave incomplete
+reference data behind.
+"""
 
-class ScraperPipeline(object):
-    def process_item(self, item, spider):
+import os
+
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+
+from docflow.bot.util.store import StoreWriter, record_names
+
+
+class ReferencePipeline:
+    """Writes scraped items into a reference store, skipping duplicates."""
+
+    def __init__(self, crawler, output_dir: str):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.output_dir = output_dir
+        self.writer = None
+        self.names = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the pipeline, unless REFERENCE_OUTPUT_DIR is not set."""
+
+        output_dir = crawler.settings.get('REFERENCE_OUTPUT_DIR')
+        if output_dir is None:
+            raise NotConfigured("REFERENCE_OUTPUT_DIR is not set")
+
+        pipeline = cls(crawler, output_dir)
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider=None):  # pylint: disable=unused-argument
+        """Starts writing a new store for the spider."""
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.writer = StoreWriter(os.path.join(self.output_dir, self.crawler.spider.name + '.ref'))
+
+    def process_item(self, item, spider=None):  # pylint: disable=unused-argument
+        """Writes the item into the store, unless it has no new names."""
+
+        try:
+            names = record_names(item)
+        except KeyError:
+            names = []
+        if not names:
+            self.stats.inc_value('reference/unnamed')
+            raise DropItem("Item without a name")
+        if self.names.issuperset(names):
+            self.stats.inc_value('reference/duplicates')
+            raise DropItem(f"Duplicate item: {', '.join(names)}")
+
+        self.names.update(names)
+        self.writer.add(dict(item))
+        self.stats.inc_value('reference/stored')
         return item
+
+    def spider_closed(self, spider, reason):  # pylint: disable=unused-argument
+        """Replaces the old store if the spider finished with items, and discards it otherwise."""
+
+        if reason == 'finished' and len(self.writer):
+            self.writer.close()
+        else:
+            self.writer.abort()
@@ -0,0 +1,227 @@
+"""
+Contains an offline crawl which rebuilds the
+reference data of a spider from the pages in
+scrapy's HTTP cache only.
+
+This is useful after fixing a bug in how the
+spiders extract data from the pages: instead of
+going through scrapy's scheduler, downloader
+middlewares and AutoThrottle delays again, the
+cached pages are read from disk directly and
+passed to the callbacks of the spider, starting
+from its start URLs. The pages are parsed in a
+process pool, one level of links at a time, and
+pages which are not in the cache are skipped,
+since nothing is ever requested from the network.
+"""
+
+import gzip
+import os
+import pickle
+from concurrent.futures import Executor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin
+
+import scrapy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from w3lib.http import headers_raw_to_dict
+
+from docflow.bot.util.store import StoreWriter, record_names
+
+from .frontier import canonical_url
+
+# Statuses of cached redirects, which are followed like RedirectMiddleware does
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+# How many pages are sent to a worker process at once
+CHUNK_SIZE = 16
+
+
+class Page(NamedTuple):
+    """A request of the offline crawl, with the spider callback to parse it."""
+
+    url: str
+    callback: str
+    meta: dict
+
+
+class CacheEntry(NamedTuple):
+    """A response in the HTTP cache."""
+
+    path: str
+    status: int
+    url: str
+    location: Optional[str]
+
+
+def read_cache_file(path: str) -> bytes:
+    """Returns the contents of a file in the HTTP cache, which may be gzipped."""
+
+    with open(path, 'rb') as cache_file:
+        data = cache_file.read()
+    return gzip.decompress(data) if data[:2] == b'\x1f\x8b' else data
+
+
+def index_cache(cache_dir: str) -> Dict[str, CacheEntry]:
+    """
+    Returns the responses cached by scrapy's
+    FilesystemCacheStorage in `cache_dir`, the
+    cache directory of a single spider, keyed on
+    the URL that was requested. Cached responses
+    never expire here.
+    """
+
+    index = {}
+    for root, _, files in os.walk(cache_dir):
+        if 'pickled_meta' not in files:
+            continue
+        meta = pickle.loads(read_cache_file(os.path.join(root, 'pickled_meta')))
+        if meta['method'] != 'GET':
+            continue
+
+        location = None
+        if meta['status'] in REDIRECT_STATUSES:
+            headers = headers_raw_to_dict(read_cache_file(os.path.join(root, 'response_headers')))
+            if headers.get(b'Location'):
+                location = headers[b'Location'][0].decode('latin-1')
+        index[canonical_url(meta['url'])] = CacheEntry(
+            root, meta['status'], meta['response_url'], location
+        )
+    return index
+
+
+def lookup(index: Dict[str, CacheEntry], url: str) -> Optional[CacheEntry]:
+    """
+    Returns the cached response for `url`, after
+    following cached redirects, or None if it
+    is missing or was not successful.
+    """
+
+    for _ in range(MAX_REDIRECTS + 1):
+        entry = index.get(canonical_url(url))
+        if entry is None or entry.location is None:
+            break
+        url = urljoin(entry.url, entry.location)
+
+    if entry is None or not 200 <= entry.status < 300:
+        return None
+    return entry
+
+
+def read_response(entry: CacheEntry, page: Page) -> scrapy.http.Response:
+    """Builds the cached response for a page, like the HttpCacheMiddleware does."""
+
+    headers = Headers(headers_raw_to_dict(
+        read_cache_file(os.path.join(entry.path, 'response_headers'))
+    ))
+    body = read_cache_file(os.path.join(entry.path, 'response_body'))
+    response_cls = responsetypes.from_args(headers=headers, url=entry.url, body=body)
+    return response_cls(
+        url=entry.url, status=entry.status, headers=headers, body=body,
+        request=scrapy.Request(page.url, meta=page.meta)
+    )
+
+
+# The spiders of a worker process, created on first use
+_SPIDERS = {}
+
+
+def parse_page(task: Tuple[type, Page, CacheEntry]) -> Tuple[List[dict], List[Page]]:
+    """
+    Passes the cached response of a page to its
+    spider callback in a worker process. Returns
+    the items and the new pages it yielded.
+    """
+
+    spider_cls, page, entry = task
+    spider = _SPIDERS.get(spider_cls)
+    if spider is None:
+        spider = _SPIDERS[spider_cls] = spider_cls()
+
+    items = []
+    pages = []
+    callback = getattr(spider, page.callback)
+    for result in callback(read_response(entry, page)) or ():
+        if isinstance(result, scrapy.Request):
+            pages.append(Page(
+                result.url,
+                result.callback.__name__ if result.callback else 'parse',
+                result.meta
+            ))
+        else:
+            items.append(dict(result))
+    return items, pages
+
+
+def crawl_cache(spider_cls: type, index: Dict[str, CacheEntry], executor: Executor,
+                stats: dict, redirects: Dict[str, str]) -> Iterator[dict]:
+    """
+    Crawls the pages of a spider in the given
+    cache index, starting from its start URLs,
+    and yields the items in the order of the
+    pages they were scraped from. Links are
+    canonicalized and sent to their known
+    `redirects` like the FrontierMiddleware does.
+    Pages are parsed in `executor`, a level at
+    a time.
+    Counts parsed pages in `stats`, along with
+    missing pages, which are not cached or whose
+    cached response was not successful.
+    """
+
+    seen = set()
+    level = [Page(url, 'parse', {}) for url in spider_cls.start_urls]
+    while level:
+        tasks = []
+        for page in level:
+            url = canonical_url(page.url)
+            url = redirects.get(url, url)
+            if (page.callback, url) in seen:
+                continue
+            seen.add((page.callback, url))
+
+            entry = lookup(index, url)
+            if entry is None:
+                stats['missing'] += 1
+            else:
+                tasks.append((spider_cls, page, entry))
+
+        level = []
+        for items, pages in executor.map(parse_page, tasks, chunksize=CHUNK_SIZE):
+            stats['parsed'] += 1
+            level += pages
+            yield from items
+
+
+def reparse(spider_cls: type, cache_dir: str, output_path: str, executor: Executor,
+            redirects: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Rebuilds the reference store of a spider at
+    `output_path` from its cache directory, with
+    duplicates dropped like the ReferencePipeline
+    does. The old store is only replaced if any
+    items were found. Returns the number of pages
+    parsed and missing, and of items stored.
+    """
+
+    stats = {'parsed': 0, 'missing': 0, 'stored': 0}
+    index = index_cache(cache_dir)
+    names = set()
+    writer = StoreWriter(output_path)
+    try:
+        for item in crawl_cache(spider_cls, index, executor, stats, redirects or {}):
+            if not names.issuperset(record_names(item)):
+                names.update(record_names(item))
+                writer.add(item)
+    except BaseException:
+        writer.abort()
+        raise
+
+    stats['stored'] = len(writer)
+    if stats['stored']:
+        writer.close()
+    else:
+        writer.abort()
+    return stats
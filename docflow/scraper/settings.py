@@ -47,27 +47,47 @@ TELNETCONSOLE_ENABLED = False
 
 # Enable or disable spider middlewares
 # See http://scrapy.readthedocs.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    'scraper.middlewares.ScraperSpiderMiddleware': 543,
-#}
+SPIDER_MIDDLEWARES = {
+    'scraper.frontier.FrontierMiddleware': 950,
+}
+
+# Canonicalize and deduplicate followed links, see scraper/frontier.py
+FRONTIER_ENABLED = True
+# Where the seen pages and known redirects are kept, defaults to .scrapy/frontier.sqlite
+FRONTIER_DB = None
+# Identifies the scrape run which shares the seen pages, defaults to a new one per crawler
+FRONTIER_RUN = None
 
 # Enable or disable downloader middlewares
 # See http://scrapy.readthedocs.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    'scraper.middlewares.MyCustomDownloaderMiddleware': 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    'scraper.incremental_crawl.IncrementalMiddleware': 800,
+}
+
+# Enable incremental scraping, see scraper/incremental_crawl.py
+INCREMENTAL = False
+# Where the state for incremental scraping is kept, defaults to .scrapy/incremental/
+INCREMENTAL_STATE = None
 
 # Enable or disable extensions
 # See http://scrapy.readthedocs.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    'scrapy.extensions.telnet.TelnetConsole': None,
-#}
+EXTENSIONS = {
+    'scraper.throughput.RunStats': 500,
+}
+
+# Append the throughput of every run to a file, see scraper/throughput.py
+RUN_STATS_ENABLED = True
+# Where the run stats are written to, defaults to .scrapy/run_stats.jsonl
+RUN_STATS_FILE = None
 
 # Configure item pipelines
 # See http://scrapy.readthedocs.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
-#    'scraper.pipelines.ScraperPipeline': 300,
-#}
+ITEM_PIPELINES = {
+    'scraper.pipelines.ReferencePipeline': 300,
+}
+
+# Where the reference stores are written to, see scraper/pipelines.py
+REFERENCE_OUTPUT_DIR = None
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See http://doc.scrapy.org/en/latest/topics/autothrottle.html
@@ -88,5 +108,41 @@ HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 60 * 60 * 24 * 30
 HTTPCACHE_DIR = 'httpcache'
 HTTPCACHE_GZIP = True
-#HTTPCACHE_IGNORE_HTTP_CODES = []
+# Responses to conditional requests would replace the cached pages
+HTTPCACHE_IGNORE_HTTP_CODES = [304]
 #HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+
+# Cache DNS lookups for the whole crawl
+DNSCACHE_ENABLED = True
+
+# Crawl profiles, applied on top of the settings above, see scraper/throughput.py
+CRAWL_PROFILE = 'polite'
+CRAWL_PROFILES = {
+    'polite': {
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 5,
+        'AUTOTHROTTLE_MAX_DELAY': 60,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 1.0,
+    },
+    'fast-cold': {
+        'CONCURRENT_REQUESTS': 32,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 16,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 0.5,
+        'AUTOTHROTTLE_MAX_DELAY': 10,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 4.0,
+        'DNSCACHE_SIZE': 1000,
+        'REACTOR_THREADPOOL_MAXSIZE': 20,
+        'DOWNLOAD_TIMEOUT': 30,
+    },
+    'cache-only': {
+        'CONCURRENT_REQUESTS': 64,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 64,
+        'AUTOTHROTTLE_ENABLED': False,
+        'DOWNLOAD_DELAY': 0,
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_EXPIRATION_SECS': 0,
+        'HTTPCACHE_IGNORE_MISSING': True,
+    },
+}
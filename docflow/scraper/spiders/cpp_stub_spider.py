@@ -35,7 +35,7 @@ class StubSpider(scrapy.Spider):
         closed within <b> tags that is found on the index page.
         """
         for link in set(response.css("b a::attr(href)").extract()):
-            yield response.follow(link, callback=self.parse_stub)
+            yield response.follow(link, callback=self.parse_stub, meta={"incremental": True})
 
     @staticmethod
     def parse_stub(response):
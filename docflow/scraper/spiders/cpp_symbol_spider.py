@@ -7,26 +7,20 @@ There are currently two different parsers for the
 links that are parsed here, namely one for function
 symbols, such as std::abs, and one for type symbols,
 such as std::vector or std::thread (see above).
+Both use the same SymbolPage, which collects
+the parts of a page they need in a single pass
+over its parsed HTML tree.
 """
 
-from html import unescape
-from typing import List, Optional
+from itertools import chain, takewhile
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import scrapy
-from w3lib.html import remove_tags
 
-RETURN_VALUE_HEADER = b'<span class="mw-headline" id="Return_value">Return value</span>'
+# The headline of the return value section, relative to its <h3>
+RETURN_VALUE_HEADLINE = "span[@id='Return_value']"
 
-def clean(string: str, *remove: str):
-    """
-    Removes HTML tags and unescapes HTML encoded strings and
-    optionally removes any specified strings from the resulting string
-    """
-
-    clean_str = unescape(remove_tags(string))
-    for item in remove:
-        clean_str = clean_str.replace(item, "")
-    return clean_str
+RETURN_VALUE_LIMIT = 250
 
 
 def get_description(member: str):
@@ -47,52 +41,141 @@ def get_title(member: str):
     return member.split("\n\n")[0].strip()
 
 
-def get_from_table(filter_text: str, tables: List[str]):
+def get_from_table(filter_text: str, tables: List[str]) -> Optional[Dict[str, str]]:
     """
-    Returns a dictionary containing information from a two column
-    table which contains the filter_text in the form of Title : Description
+    Returns a dictionary containing information from the text
+    of a two column table which contains the filter_text
+    in the form of Title : Description
     """
 
     for table in tables:
         if filter_text in table:
-            members = clean(table).split("\n\n\n\n")
+            members = table.split("\n\n\n\n")
             member_titles = [get_title(member) for member in members]
             member_descriptions = [get_description(member) for member in members]
             return dict(zip(member_titles, member_descriptions))
+    return None
+
+
+def text(element) -> str:
+    """Returns the text content of an element, without its tail."""
+
+    return ''.join(element.itertext())
+
+
+def own_text(element) -> List[str]:
+    """
+    Returns the text nodes directly inside
+    an element, like the CSS `::text`.
+    """
 
+    texts = [element.text] + [child.tail for child in element]
+    return [string for string in texts if string]
 
-def get_return_values(resp: str) -> Optional[str]:
+
+def contents(elements: Iterable) -> Iterator[str]:
+    """Yields the text content of the given elements, along with their tails."""
+
+    for element in elements:
+        if isinstance(element.tag, str):
+            yield text(element)
+        if element.tail:
+            yield element.tail
+
+
+def has_class(element, name: str) -> bool:
+    """Returns whether `name` is one of the classes of an element."""
+
+    return name in element.get('class', '').split()
+
+
+def get_return_values(heading) -> Optional[str]:
     """
-    Attempts to extract the return values
-    from the response body. If this is longer
-    than around 250 characters, chances are
-    high that it's garbage, meaning that
-    no return values were found.
+    Attempts to extract the return values from
+    the section below the <h3> `heading`, up to
+    the next <h3>. If this is longer than around
+    250 characters, chances are high that it's
+    garbage, meaning that no return values
+    were found.
     """
 
-    start = resp.find(RETURN_VALUE_HEADER)
-    if start is None:
+    if heading is None:
         return None
-    start += len(RETURN_VALUE_HEADER)
-    end = resp.find(b"<h3>", start)
-    ret_vals = unescape(remove_tags(resp[start:end]))
-    return ret_vals if len(ret_vals) < 250 else None
+
+    headline = heading.find(RETURN_VALUE_HEADLINE)
+    ret_vals = ''.join(chain(
+        [headline.tail or ''],
+        contents(headline.itersiblings()),
+        [heading.tail or ''],
+        contents(takewhile(lambda element: element.tag != 'h3', heading.itersiblings()))
+    ))
+    return ret_vals if len(ret_vals) < RETURN_VALUE_LIMIT else None
 
 
-def get_signatures(resp: scrapy.http.Response) -> str:
+class SymbolPage:  # pylint: disable=too-many-instance-attributes
     """
-    Placeholder function to return
-    signatures of a symbol function.
+    The parts of a symbol page which are scraped,
+    collected from its parsed HTML tree in a single
+    pass over the elements, instead of a separate
+    query for every part.
     """
 
-    signatures = resp.css(
-        "tbody tr.t-dcl"
-    ).extract()
-    return remove_tags(
-        unescape(
-            ''.join(s.replace('\u00a0', '') for s in signatures)
-        )
-    ).strip()
+    def __init__(self, root):  # pylint: disable=too-many-branches
+        self.names = []
+        self.headers = []
+        self.signatures = []
+        self.descriptions = []
+        self.parameters = []
+        self.tables = []
+        self.example = None
+        return_heading = None
+
+        for element in root.iter('h1', 'h3', 'tr', 'table', 'div'):
+            if element.tag == 'h3':
+                if return_heading is None and element.find(
+                        RETURN_VALUE_HEADLINE) is not None:
+                    return_heading = element
+                continue
+
+            classes = element.get('class')
+            if classes is None:
+                continue
+            classes = classes.split()
+
+            if element.tag == 'h1':
+                if 'firstHeading' in classes:
+                    self.names += own_text(element)
+            elif element.tag == 'tr':
+                if 't-dsc-header' in classes:
+                    self.headers += (name for link in element.iter('a') for name in own_text(link))
+                elif 't-dcl' in classes and next(element.iterancestors('tbody'), None) is not None:
+                    self.signatures.append(text(element))
+            elif element.tag == 'table':
+                if 't-par-begin' in classes:
+                    row = element.find('.//tr')
+                    self.parameters.append(text(row) if row is not None else '')
+                elif 't-dsc-begin' in classes:
+                    self.tables.append(text(element))
+            elif 'mw-content-ltr' in classes:
+                paragraph = element.find('p')
+                self.descriptions.append(text(paragraph) if paragraph is not None else '')
+            elif 'cpp' in classes and self.example is None and any(
+                    has_class(parent, 't-example') for parent in element.iterancestors('div')):
+                pre = element.find('pre')
+                self.example = text(pre) if pre is not None else ''
+
+        self.return_values = get_return_values(return_heading)
+
+    @classmethod
+    def from_response(cls, resp: scrapy.http.Response) -> 'SymbolPage':
+        """Collects the parts of the page from the response's parsed HTML tree."""
+
+        return cls(resp.selector.root)
+
+    def signature(self) -> str:
+        """Returns the declarations of the symbol."""
+
+        return ''.join(self.signatures).replace('\u00a0', '').strip()
 
 
 class CppSymbolSpider(scrapy.Spider):
@@ -118,7 +201,9 @@ class CppSymbolSpider(scrapy.Spider):
 
         for url in set(response.css('a::attr(href)').extract()):
             if url.startswith("/w/cpp") and not url.endswith('symbol_index'):
-                yield response.follow(url, callback=self.parse_symbol_index)
+                yield response.follow(
+                    url, callback=self.parse_symbol_index, meta={"incremental": True}
+                )
 
     def parse_symbol_index(self, resp: scrapy.http.Response):
         """
@@ -126,19 +211,19 @@ class CppSymbolSpider(scrapy.Spider):
         in the std:: namespace.
         """
 
-        names = resp.css("h1.firstHeading::text").extract()
-        if not all((n.islower() or n == '_' and n.startswith("std::")) for n in names):
+        page = SymbolPage.from_response(resp)
+        if not all((n.islower() or n == '_' and n.startswith("std::")) for n in page.names):
             # It's some unwanted link, ignore it
             return
-        elif get_return_values(resp.body) is not None:
+        elif page.return_values is not None:
             # It's a function, yield from the function symbol parser
-            yield from self.parse_function(resp)
+            yield from self.parse_function(resp, page)
         else:
             # It's a type, yield from the type symbol parser
-            yield from self.parse_type(resp)
+            yield from self.parse_type(resp, page)
 
     @staticmethod
-    def parse_function(resp: scrapy.http.Response):
+    def parse_function(resp: scrapy.http.Response, page: SymbolPage):
         """
         Parses a function symbol.
 
@@ -148,50 +233,32 @@ class CppSymbolSpider(scrapy.Spider):
             http://en.cppreference.com/w/cpp/io/manip/hex
         """
 
-        names = resp.css("h1.firstHeading::text").extract()
         names_without_commas = [
-            n.replace(', ', '') for n in names if n != ', '
+            n.replace(', ', '') for n in page.names if n != ', '
         ]
         if not names_without_commas:
             return
         elif not all(n.islower() or n == '_' for n in names_without_commas):
             return
 
-        headers = resp.css(
-            "tr.t-dsc-header a::text"
-        ).extract()
-        signatures = get_signatures(resp)
-        description = resp.css(
-            "div.mw-content-ltr"
-        ).xpath("string(p)").extract()
-        return_values = get_return_values(resp.body)
-        parameters = resp.css(
-            "table.t-par-begin"
-        ).xpath("string(.//tr)").extract()
-        example = resp.css(
-            "div.t-example div.cpp"
-        ).xpath("string(pre)").extract_first()
-
         yield {
             'type': 0,
             'names': [
                 "std::" + n for n in names_without_commas
             ],
-            'header': list(set(headers)),
-            'sigs': signatures,
-            'desc': [
-                remove_tags(paragraph) for paragraph in description
-            ],
-            'return': return_values,
+            'header': list(set(page.headers)),
+            'sigs': page.signature(),
+            'desc': page.descriptions,
+            'return': page.return_values,
             'params': [
-                param.replace('\n', '').strip() for param in parameters
+                param.replace('\n', '').strip() for param in page.parameters
             ],
-            'example': example,
+            'example': page.example,
             'link': resp.url
         }
 
     @staticmethod
-    def parse_type(resp: scrapy.http.Response):
+    def parse_type(resp: scrapy.http.Response, page: SymbolPage):
         """
         Parses a type symbol.
 
@@ -200,23 +267,16 @@ class CppSymbolSpider(scrapy.Spider):
             http://en.cppreference.com/w/cpp/container/vector
         """
 
-        name = resp.css("h1.firstHeading::text").extract_first()
-        if name is None:
+        if not page.names:
             return
-        header = resp.css("tr.t-dsc-header a::text").extract()
-        sigs = get_signatures(resp)
-        desc = resp.css("div.mw-content-ltr").xpath("string(p)").extract()
-        tables = resp.css("table.t-dsc-begin").extract()
-        types = get_from_table("Member type", tables)
-        funcs = get_from_table("member function", tables)
 
         yield {
             'type': 1,
-            'names': ["std::" + name],
-            'header': header,
-            'sigs': sigs,
-            'desc': desc,
-            'types': types,
-            'funcs': funcs,
+            'names': ["std::" + page.names[0]],
+            'header': page.headers,
+            'sigs': page.signature(),
+            'desc': page.descriptions,
+            'types': get_from_table("Member type", page.tables),
+            'funcs': get_from_table("member function", page.tables),
             'link': resp.url
         }
@@ -0,0 +1,135 @@
+"""
+Contains the crawl profiles, which tune how
+fast the spiders crawl, and an extension which
+records how fast every run actually was.
+
+The profiles are defined by CRAWL_PROFILES in
+the settings, as the settings each of them
+overrides, and are applied by `apply_profile`
+when scraping through `python3 -m docflow`:
+
+    polite:     few concurrent requests, with AutoThrottle
+                starting at a 5 second delay. The default.
+    fast-cold:  many concurrent requests and short delays,
+                for crawls with an empty or outdated cache.
+    cache-only: only serves pages from the HTTP cache,
+                without any delays and without sending any
+                request for pages that are not cached.
+
+Cached pages are returned by the HTTP cache before
+requests reach the downloader, so the delays of a
+profile only ever apply to cache misses.
+
+After every run, the RunStats extension appends
+a JSON line with the requests per second, the
+cache hit ratio, the bytes downloaded and the
+duplicate links that were skipped to the file
+set by RUN_STATS_FILE, which defaults to
+`.scrapy/run_stats.jsonl`.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import data_path
+
+def apply_profile(settings, name: Optional[str] = None):
+    """
+    Applies the crawl profile `name`, by default
+    the one set by CRAWL_PROFILE, to the given
+    settings, before a crawler is created from them.
+    Raises a ValueError for unknown profiles.
+    """
+
+    name = name or settings.get('CRAWL_PROFILE')
+    profiles = settings.getdict('CRAWL_PROFILES')
+    if name not in profiles:
+        raise ValueError(f"Unknown crawl profile {name}, expected one of {', '.join(profiles)}")
+    settings.setdict(profiles[name])
+    settings.set('CRAWL_PROFILE', name)
+
+
+class RunStats:
+    """
+    Records the throughput of a crawl in its stats,
+    and appends it to the run stats file when the
+    spider is closed.
+    """
+
+    def __init__(self, crawler, path: str):
+        self.stats = crawler.stats
+        self.profile = crawler.settings.get('CRAWL_PROFILE')
+        self.path = path
+        self.start_time = None
+        self.downloads = 0
+        self.bytes_downloaded = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the extension, unless RUN_STATS_ENABLED is not set."""
+
+        if not crawler.settings.getbool('RUN_STATS_ENABLED'):
+            raise NotConfigured("RUN_STATS_ENABLED is not set")
+
+        path = crawler.settings.get('RUN_STATS_FILE') or data_path('run_stats.jsonl')
+        extension = cls(crawler, path)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            extension.response_downloaded, signal=signals.response_downloaded
+        )
+        return extension
+
+    def spider_opened(self, spider):  # pylint: disable=unused-argument
+        """Starts timing the run."""
+
+        self.start_time = time.perf_counter()
+
+    def response_downloaded(self, response, request, spider):  # pylint: disable=unused-argument
+        """
+        Counts responses which were actually downloaded.
+        Unlike the downloader stats, this excludes
+        responses served from the HTTP cache.
+        """
+
+        self.downloads += 1
+        self.bytes_downloaded += len(response.body)
+
+    def spider_closed(self, spider, reason):
+        """Computes the throughput of the run and appends it to the run stats file."""
+
+        # The spider may be closed before it was opened, if opening it failed
+        elapsed = 0.0 if self.start_time is None else time.perf_counter() - self.start_time
+        requests = self.stats.get_value('downloader/request_count', 0)
+        hits = self.stats.get_value('httpcache/hit', 0)
+        misses = self.stats.get_value('httpcache/miss', 0)
+        run = {
+            'spider': spider.name,
+            'profile': self.profile,
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'reason': reason,
+            'elapsed': round(elapsed, 3),
+            'requests': requests,
+            'requests_per_second': round(requests / elapsed, 2) if elapsed else 0.0,
+            'downloads': self.downloads,
+            'cache_hits': hits,
+            'cache_misses': misses,
+            'cache_hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'bytes_downloaded': self.bytes_downloaded,
+            'duplicates_skipped': (self.stats.get_value('frontier/duplicates', 0)
+                                   + self.stats.get_value('dupefilter/filtered', 0)),
+            'redirects_followed': self.stats.get_value('frontier/redirects_followed', 0),
+            'items': self.stats.get_value('item_scraped_count', 0)
+        }
+        for key in ('requests_per_second', 'cache_hit_ratio', 'bytes_downloaded',
+                    'duplicates_skipped'):
+            self.stats.set_value('run/' + key, run[key])
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as stats_file:
+            stats_file.write(json.dumps(run) + '\n')
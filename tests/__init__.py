@@ -0,0 +1 @@
+"""Tests for docflow, run with `python3 -m pytest` from the root directory."""
@@ -0,0 +1,62 @@
+"""Tests for the ExpiryScheduler."""
+
+import asyncio
+
+from docflow.bot.util.expiry import ExpiryScheduler
+
+
+def test_calls_in_deadline_order():
+    async def run():
+        scheduler = ExpiryScheduler()
+        calls = []
+        for delay in (0.03, 0.01, 0.02):
+            scheduler.schedule(delay, lambda delay=delay: calls.append(delay))
+        assert len(scheduler) == 3
+        await asyncio.sleep(0.1)
+        assert len(scheduler) == 0
+        return calls
+
+    assert asyncio.run(run()) == [0.01, 0.02, 0.03]
+
+
+def test_cancelled_calls_are_not_made():
+    async def run():
+        scheduler = ExpiryScheduler()
+        calls = []
+        first = scheduler.schedule(0.01, lambda: calls.append('first'))
+        scheduler.schedule(0.02, lambda: calls.append('second'))
+        scheduler.cancel(first)
+        scheduler.cancel(first)
+        assert len(scheduler) == 1
+        await asyncio.sleep(0.1)
+        return calls
+
+    assert asyncio.run(run()) == ['second']
+
+
+def test_cancelling_most_calls_compacts_the_heap():
+    async def run():
+        scheduler = ExpiryScheduler()
+        expiries = [scheduler.schedule(60, lambda: None) for _ in range(10)]
+        for expiry in expiries[:6]:
+            scheduler.cancel(expiry)
+        assert len(scheduler) == 4
+        # pylint: disable=protected-access
+        assert len(scheduler._heap) < 10
+        for expiry in expiries[6:]:
+            scheduler.cancel(expiry)
+        assert scheduler._timer is None
+
+    asyncio.run(run())
+
+
+def test_cancelling_after_the_call_does_nothing():
+    async def run():
+        scheduler = ExpiryScheduler()
+        calls = []
+        expiry = scheduler.schedule(0, lambda: calls.append(1))
+        await asyncio.sleep(0.05)
+        scheduler.cancel(expiry)
+        return calls, len(scheduler)
+
+    assert asyncio.run(run()) == ([1], 0)
@@ -0,0 +1,42 @@
+"""Tests for the URL canonicalization of the crawl frontier."""
+
+import pytest
+
+from docflow.scraper.frontier import canonical_url
+
+WIKI = 'http://en.cppreference.com'
+VECTOR = WIKI + '/w/cpp/container/vector'
+
+CASES = [
+    # Anchors are stripped
+    (VECTOR + '#Member_types', VECTOR),
+    (VECTOR + '#', VECTOR),
+    # Pages given as title to the wiki scripts
+    (WIKI + '/mwiki/index.php?title=cpp/container/vector', VECTOR),
+    (WIKI + '/w/index.php?title=cpp/container/vector#Iterators', VECTOR),
+    (WIKI + '/mwiki/index.php?title=cpp/container/vector&action=edit',
+     WIKI + '/mwiki/index.php?action=edit&title=cpp%2Fcontainer%2Fvector'),
+    # Duplicate slashes, also in front of the wiki path and in titles
+    (WIKI + '//w/cpp/container/vector', VECTOR),
+    (WIKI + '/w//cpp///container/vector', VECTOR),
+    (WIKI + '//mwiki/index.php?title=cpp//container/vector', VECTOR),
+    # Spaces in wiki titles become underscores
+    (WIKI + '/w/cpp/container/vector%20bool', VECTOR + '_bool'),
+    (WIKI + '/w/cpp/container/vector bool', VECTOR + '_bool'),
+    (WIKI + '/mwiki/index.php?title=cpp/container/vector%20bool', VECTOR + '_bool'),
+    # Scheme and host are lower-cased, query arguments sorted
+    ('HTTP://EN.cppreference.com/w/cpp/container/vector', VECTOR),
+    (WIKI + '/mwiki/load.php?b=2&a=1', WIKI + '/mwiki/load.php?a=1&b=2'),
+    # Paths outside of the wiki keep their spaces
+    (WIKI + '/mwiki/a%20b', WIKI + '/mwiki/a%20b'),
+]
+
+
+@pytest.mark.parametrize('url, expected', CASES)
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+@pytest.mark.parametrize('url, _', CASES)
+def test_canonical_url_is_idempotent(url, _):
+    assert canonical_url(canonical_url(url)) == canonical_url(url)
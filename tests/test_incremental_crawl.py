@@ -0,0 +1,47 @@
+"""Tests for merging the results of an incremental scrape."""
+
+import pytest
+
+from docflow.scraper.incremental_crawl import merge_items
+
+
+def item(link: str, version: int = 1) -> dict:
+    """Returns a minimal scraped item for the page at `link`."""
+
+    return {'link': link, 'name': link.rsplit('/', 1)[-1], 'version': version}
+
+
+OLD = [item('/w/a'), item('/w/b'), item('/w/c'), item('/w/d')]
+ALL_PAGES = ['/w/a', '/w/b', '/w/c', '/w/d']
+
+CASES = [
+    # Unchanged pages yield no new items, so the old ones are kept
+    ({'new': [], 'requested': ALL_PAGES}, OLD),
+    # New items replace the old items of their page
+    ({'new': [item('/w/b', 2)], 'requested': ALL_PAGES},
+     [item('/w/b', 2), item('/w/a'), item('/w/c'), item('/w/d')]),
+    # Pages which are no longer linked are dropped
+    ({'new': [], 'requested': ['/w/a', '/w/c']}, [item('/w/a'), item('/w/c')]),
+    # Pages which changed but no longer yield items are dropped
+    ({'new': [], 'requested': ALL_PAGES, 'changed': ['/w/d']}, OLD[:3]),
+    # Pages which are gone are dropped
+    ({'new': [], 'requested': ALL_PAGES, 'gone': ['/w/a']}, OLD[1:]),
+    # Pages whose request failed were neither parsed nor gone, so they keep their items
+    ({'new': [item('/w/b', 2)], 'requested': ALL_PAGES, 'changed': ['/w/b']},
+     [item('/w/b', 2), item('/w/a'), item('/w/c'), item('/w/d')]),
+    # New pages are added
+    ({'new': [item('/w/e')], 'requested': ALL_PAGES + ['/w/e']}, [item('/w/e')] + OLD),
+    # Several items per page all come from the new scrape
+    ({'new': [item('/w/c', 2), item('/w/c', 3)], 'requested': ALL_PAGES, 'changed': ['/w/c']},
+     [item('/w/c', 2), item('/w/c', 3), item('/w/a'), item('/w/b'), item('/w/d')]),
+]
+
+
+@pytest.mark.parametrize('args, expected', CASES)
+def test_merge_items(args, expected):
+    assert list(merge_items(OLD, **args)) == expected
+
+
+def test_merge_items_without_old_items():
+    new = [item('/w/a')]
+    assert list(merge_items([], new, ['/w/a'])) == new
@@ -0,0 +1,38 @@
+"""Tests for the RateLimiter."""
+
+import asyncio
+
+from docflow.bot.util.ratelimit import RateLimiter
+
+
+def test_spaces_out_concurrent_calls():
+    async def run():
+        limiter = RateLimiter(0.05)
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        times = []
+
+        async def call(idx):
+            await limiter.wait()
+            times.append((idx, loop.time() - start))
+
+        await asyncio.gather(*(call(idx) for idx in range(4)))
+        return times
+
+    times = asyncio.run(run())
+    assert [idx for idx, _ in times] == [0, 1, 2, 3]
+    for (_, earlier), (_, later) in zip(times, times[1:]):
+        assert later - earlier >= 0.04
+
+
+def test_does_not_wait_after_idle_interval():
+    async def run():
+        limiter = RateLimiter(0.01)
+        await limiter.wait()
+        await asyncio.sleep(0.05)
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        await limiter.wait()
+        return loop.time() - start
+
+    assert asyncio.run(run()) < 0.01
@@ -0,0 +1,88 @@
+"""Tests for the EvalScheduler."""
+
+import asyncio
+
+import pytest
+
+from docflow.bot.util.scheduler import EvalScheduler, QueueFull
+
+
+def test_runs_up_to_concurrency_and_queues_the_rest():
+    async def run():
+        scheduler = EvalScheduler(concurrency=2, max_queued=10)
+        release = asyncio.Event()
+
+        async def job(value):
+            await release.wait()
+            return value
+
+        submitted = [scheduler.submit('guild', lambda value=value: job(value))
+                     for value in range(4)]
+        assert [position for _, position in submitted] == [0, 0, 1, 2]
+        assert (scheduler.running, scheduler.queued) == (2, 2)
+
+        release.set()
+        return await asyncio.gather(*(future for future, _ in submitted))
+
+    assert asyncio.run(run()) == [0, 1, 2, 3]
+
+
+def test_serves_guilds_round_robin():
+    async def run():
+        scheduler = EvalScheduler(concurrency=1, max_queued=10)
+        order = []
+        release = asyncio.Event()
+
+        async def job(name):
+            await release.wait()
+            order.append(name)
+
+        futures = []
+        positions = []
+        for key, name in [('a', 'a0'), ('a', 'a1'), ('a', 'a2'), ('b', 'b1'), ('c', 'c1')]:
+            future, position = scheduler.submit(key, lambda name=name: job(name))
+            futures.append(future)
+            positions.append(position)
+
+        release.set()
+        await asyncio.gather(*futures)
+        return order, positions
+
+    order, positions = asyncio.run(run())
+    assert order == ['a0', 'a1', 'b1', 'c1', 'a2']
+    # Positions are those at the time of submission, ahead of later guilds
+    assert positions == [0, 1, 2, 2, 3]
+
+
+def test_raises_queue_full():
+    async def run():
+        scheduler = EvalScheduler(concurrency=1, max_queued=1)
+        release = asyncio.Event()
+        first, _ = scheduler.submit('a', release.wait)
+        scheduler.submit('a', release.wait)
+        with pytest.raises(QueueFull):
+            scheduler.submit('b', release.wait)
+        release.set()
+        await first
+
+    asyncio.run(run())
+
+
+def test_passes_on_exceptions():
+    async def run():
+        scheduler = EvalScheduler(concurrency=1)
+
+        async def fail():
+            raise RuntimeError("failed")
+
+        future, _ = scheduler.submit('a', fail)
+        with pytest.raises(RuntimeError):
+            await future
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+
+def test_rejects_zero_concurrency():
+    with pytest.raises(ValueError):
+        EvalScheduler(concurrency=0)
@@ -0,0 +1,78 @@
+"""Tests for the binary reference store."""
+
+import pytest
+
+from docflow.bot.util.store import HEADER, ReferenceStore, StoreWriter, build_store
+
+RECORDS = [
+    {'names': ['std::abs', 'std::labs'], 'link': '/w/cpp/numeric/math/abs'},
+    {'names': ['std::vector'], 'link': '/w/cpp/container/vector'},
+    {'name': 'std::accumulate', 'link': '/w/cpp/algorithm/accumulate'},
+]
+
+
+@pytest.fixture(name='store_path')
+def fixture_store_path(tmp_path):
+    """Returns the path of a store with RECORDS in it."""
+
+    path = str(tmp_path / 'test.ref')
+    build_store(RECORDS, path)
+    return path
+
+
+def test_round_trip(store_path):
+    store = ReferenceStore(store_path)
+    assert len(store) == len(RECORDS)
+    assert store.names == [['std::abs', 'std::labs'], ['std::vector'], ['std::accumulate']]
+    assert list(store) == RECORDS
+    assert store[-1] == RECORDS[-1]
+    with pytest.raises(IndexError):
+        _ = store[len(RECORDS)]
+    store.close()
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / 'empty.ref')
+    build_store([], path)
+    assert not list(ReferenceStore(path))
+
+
+def test_aborted_writer_keeps_old_store(store_path):
+    with pytest.raises(RuntimeError):
+        with StoreWriter(store_path) as writer:
+            writer.add({'name': 'std::move'})
+            raise RuntimeError
+    assert list(ReferenceStore(store_path)) == RECORDS
+
+
+def truncated_lengths(size: int):
+    """Yields lengths to truncate a store of `size` bytes to."""
+
+    yield from (0, 1, HEADER.size - 1, HEADER.size, HEADER.size + 1, size // 2, size - 1)
+
+
+def test_truncated_store(store_path):
+    with open(store_path, 'rb') as store_file:
+        data = store_file.read()
+    for length in truncated_lengths(len(data)):
+        with open(store_path, 'wb') as store_file:
+            store_file.write(data[:length])
+        with pytest.raises(ValueError):
+            ReferenceStore(store_path)
+
+
+def test_not_a_store(tmp_path):
+    path = tmp_path / 'other.ref'
+    path.write_bytes(b'x' * 100)
+    with pytest.raises(ValueError, match='not a reference store'):
+        ReferenceStore(str(path))
+
+
+def test_corrupt_record(store_path):
+    with open(store_path, 'r+b') as store_file:
+        store_file.seek(HEADER.size)
+        store_file.write(b'\0' * 4)
+    store = ReferenceStore(store_path)
+    with pytest.raises(ValueError, match='corrupt reference store'):
+        _ = store[0]
+    assert store[1] == RECORDS[1]